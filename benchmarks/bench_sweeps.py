@@ -0,0 +1,360 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © keithleygui Project Contributors
+# Licensed under the terms of the MIT License
+# (see LICENSE.txt for details)
+
+"""
+End-to-end sweep throughput benchmark.
+
+Runs transfer, output, IV and pulsed sweeps of different sizes and with settings
+for one or two SMUs through :class:`keithleygui.main.MeasureThread` against a
+:class:`keithleygui.simulation.SimulatedKeithley2600` and plots the results with
+:class:`keithleygui.pyqtplot_canvas.SweepDataPlot`. For every case, the wall time per
+phase, the throughput and the peak Python memory are recorded and saved as JSON::
+
+    python benchmarks/bench_sweeps.py -o results.json
+    python benchmarks/bench_sweeps.py -o new.json --compare results.json
+
+By default, the simulated instrument does not sleep (``--time-scale 0``) so that the
+wall time is the overhead of keithleygui, pyqtgraph and the driver interface. The
+instrument time which a real Keithley would need is reported separately as
+"instrument" and included in the projected throughput.
+
+Phases:
+
+- queue: from submitting a job until the worker starts it
+- sweep: from the start of the job until the worker reports it as finished
+- progress_plot: total time spent passing intermediate results to the plot and
+  drawing and rendering the frames in which it shows them while the sweep is running
+- plot: plotting the final result with :meth:`SweepDataPlot.plot`
+- render: rendering the plot widget
+- instrument: simulated instrument time
+
+Peak memory is measured with :mod:`tracemalloc` in a separate run which is not timed,
+since tracing slows down every allocation. It includes numpy arrays but not memory
+allocated by Qt. Journals of the sweeps are written to a temporary directory.
+"""
+
+# system imports
+import os
+import sys
+import json
+import time
+import tempfile
+import platform
+import argparse
+import statistics
+import tracemalloc
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+# external imports
+import numpy as np
+import pyqtgraph as pg
+from PyQt5 import QtCore, QtWidgets
+
+# local imports
+import keithleygui
+from keithleygui.main import MeasureThread
+from keithleygui.measurement import SweepJob
+from keithleygui.pyqtplot_canvas import SweepDataPlot
+from keithleygui.simulation import SimulatedKeithley2600
+
+SMU_SETTINGS = {
+    "smua": {"sense": "SENSE_LOCAL", "limiti": 0.1, "limitv": 200, "highc": False},
+    "smub": {"sense": "SENSE_LOCAL", "limiti": 0.1, "limitv": 200, "highc": False},
+}
+
+# number of SMUs which are swept by each sweep type
+MIN_SMUS = {"transfer": 2, "output": 2, "iv": 1, "pulsed": 2}
+
+GENERAL_PARAMS = {
+    "tInt": 0.02,
+    "delay": -1,
+    "pulsed": False,
+    "smu_gate": "smua",
+    "smu_drain": "smub",
+}
+
+
+def sweep_params(sweep_type, n_points, pulsed=False):
+    """
+    Returns sweep parameters with ``n_points`` points per sub-sweep, including the
+    forward and reverse sweeps.
+    """
+
+    step = 60 / (n_points // 2 - 1)
+    params = dict(GENERAL_PARAMS, sweep_type=sweep_type, pulsed=pulsed)
+
+    if sweep_type == "transfer":
+        params.update(VgStart=0, VgStop=-60, VgStep=step, VdList=[-5, -60])
+    elif sweep_type == "output":
+        params.update(VdStart=0, VdStop=-60, VdStep=step, VgList=[0, -20, -40, -60])
+    elif sweep_type == "iv":
+        params.update(VStart=-30, VStop=30, VStep=step, smu_sweep="smua")
+
+    return params
+
+
+def smu_settings(n_smus):
+    """Returns the settings for the first ``n_smus`` SMUs."""
+    return dict(list(SMU_SETTINGS.items())[:n_smus])
+
+
+def cases(point_counts, smu_counts):
+    """
+    Yields the name, SMU count and sweep parameters of all benchmark cases. Sweep
+    types which need more SMUs than are set up are skipped.
+    """
+    for n_points in point_counts:
+        for n_smus in smu_counts:
+            for case in ("transfer", "output", "iv", "pulsed"):
+                if MIN_SMUS[case] > n_smus:
+                    continue
+
+                if case == "pulsed":
+                    params = sweep_params("transfer", n_points, pulsed=True)
+                else:
+                    params = sweep_params(case, n_points)
+
+                yield f"{case}-{n_points}-{n_smus}smu", n_smus, params
+
+
+class SweepBenchmark:
+    """
+    Runs a single sweep through a :class:`MeasureThread` and records phase timings.
+
+    :param thread: Running measurement worker.
+    :param canvas: Plot widget.
+    """
+
+    def __init__(self, thread, canvas):
+        self.thread = thread
+        self.canvas = canvas
+        self.loop = QtCore.QEventLoop()
+
+        self.thread.started_sig.connect(self.on_started)
+        self.thread.progress_sig.connect(self.on_progress)
+        self.thread.finished_sig.connect(self.on_finished)
+        self.thread.error_sig.connect(self.on_finished)
+
+        # time the frames of live updates together with rendering them
+        self._draw_frame = self.canvas._on_frame
+        self.canvas._frame_timer.timeout.disconnect()
+        self.canvas._frame_timer.timeout.connect(self.on_frame)
+
+        self.timings = dict(progress_plot=0.0)
+
+    def run(self, params, n_smus=2):
+        """Runs a sweep and returns the finished job and its phase timings."""
+
+        self.timings = dict(progress_plot=0.0)
+        self.job = None
+
+        keithley = self.thread.keithley
+        t_instrument = keithley.simulated_time
+
+        self.t_submit = time.perf_counter()
+        self.thread.submit(params, smu_settings(n_smus))
+        self.loop.exec_()
+
+        job = self.job
+
+        if job.state == SweepJob.FAILED:
+            raise RuntimeError(f"Benchmark sweep failed: {job.error!r}")
+
+        t0 = time.perf_counter()
+        self.canvas.plot(job.sweep_data)
+        t1 = time.perf_counter()
+        self.canvas.grab()
+        t2 = time.perf_counter()
+
+        self.timings["plot"] = t1 - t0
+        self.timings["render"] = t2 - t1
+        self.timings["instrument"] = keithley.simulated_time - t_instrument
+
+        return job, self.timings
+
+    def on_started(self, job):
+        self.t_started = time.perf_counter()
+        self.timings["queue"] = self.t_started - self.t_submit
+        self.canvas.clear()
+
+    def on_progress(self, job, sweep_data):
+        t0 = time.perf_counter()
+        if self.canvas.lines:
+            self.canvas.update_plot(sweep_data)
+        else:
+            self.canvas.plot(sweep_data)
+        self.timings["progress_plot"] += time.perf_counter() - t0
+
+    def on_frame(self):
+        t0 = time.perf_counter()
+        redraw = self.canvas._pending_data is not None
+        redraw = redraw or self.canvas._autorange_pending
+
+        self._draw_frame()
+
+        if redraw:
+            self.canvas.grab()
+            self.timings["progress_plot"] += time.perf_counter() - t0
+
+    def on_finished(self, job):
+        self.timings["sweep"] = time.perf_counter() - self.t_started
+        self.job = job
+        self.loop.quit()
+
+
+def run_case(bench, params, n_smus, repeat):
+    """Runs a benchmark case ``repeat`` times and returns the median results."""
+
+    runs = []
+
+    for _ in range(repeat):
+        job, timings = bench.run(params, n_smus)
+
+        time_scale = bench.thread.keithley.time_scale
+        wall = sum(timings[p] for p in ("queue", "sweep", "plot", "render"))
+        overhead = wall - timings["instrument"] * time_scale
+        # every sub-sweep of a FET measurement adds three current columns
+        n_sweeps = max(1, (job.sweep_data.ncols - 1) // 3)
+        n_points = job.sweep_data.nrows * n_sweeps
+
+        runs.append(
+            dict(
+                points=n_points,
+                wall_time=wall,
+                points_per_s=n_points / wall,
+                projected_points_per_s=n_points / (overhead + timings["instrument"]),
+                phases=timings,
+            )
+        )
+
+    result = dict(points=runs[0]["points"])
+
+    for key in ("wall_time", "points_per_s", "projected_points_per_s"):
+        result[key] = statistics.median(r[key] for r in runs)
+
+    # tracing slows down every allocation, measure memory in an untimed run
+    tracemalloc.start()
+    bench.run(params, n_smus)
+    _, result["peak_memory"] = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result["phases"] = {
+        phase: statistics.median(r["phases"][phase] for r in runs)
+        for phase in runs[0]["phases"]
+    }
+
+    return result
+
+
+def compare(results, reference):
+    """Prints the relative throughput change of every case against a reference."""
+
+    print(f"\n{'case':<20} {'points/s':>12} {'reference':>12} {'change':>8}")
+
+    for name, result in results["cases"].items():
+        if name not in reference["cases"]:
+            continue
+
+        new = result["points_per_s"]
+        old = reference["cases"][name]["points_per_s"]
+        print(f"{name:<20} {new:>12.0f} {old:>12.0f} {(new / old - 1):>+8.1%}")
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument(
+        "-o", "--output", default="benchmark-results.json", help="JSON output file"
+    )
+    parser.add_argument(
+        "-n",
+        "--points",
+        type=int,
+        nargs="+",
+        default=[100, 1000, 10000],
+        help="points per sub-sweep, including forward and reverse sweeps",
+    )
+    parser.add_argument(
+        "-s",
+        "--smus",
+        type=int,
+        nargs="+",
+        choices=[1, 2],
+        default=[1, 2],
+        help="numbers of SMUs to set up, sweeps which need more SMUs are skipped",
+    )
+    parser.add_argument(
+        "-r", "--repeat", type=int, default=3, help="repetitions per case"
+    )
+    parser.add_argument(
+        "--time-scale",
+        type=float,
+        default=0,
+        help="scale of the simulated instrument time, 1 for real-time (default: 0)",
+    )
+    parser.add_argument("--compare", help="JSON results to compare against")
+    args = parser.parse_args()
+
+    app = QtWidgets.QApplication(sys.argv)
+
+    keithley = SimulatedKeithley2600(time_scale=args.time_scale, seed=0)
+    journal_dir = tempfile.TemporaryDirectory()
+    thread = MeasureThread(keithley, journal_dir=journal_dir.name)
+    thread.start()
+
+    canvas = SweepDataPlot()
+    canvas.resize(800, 600)
+    canvas.show()
+
+    bench = SweepBenchmark(thread, canvas)
+
+    results = dict(
+        metadata=dict(
+            keithleygui=keithleygui.__version__,
+            python=platform.python_version(),
+            numpy=np.__version__,
+            pyqtgraph=pg.__version__,
+            qt=QtCore.QT_VERSION_STR,
+            platform=platform.platform(),
+            date=time.strftime("%Y-%m-%dT%H:%M:%S"),
+            time_scale=args.time_scale,
+            repeat=args.repeat,
+        ),
+        cases=dict(),
+    )
+
+    for name, n_smus, params in cases(args.points, args.smus):
+        result = run_case(bench, params, n_smus, args.repeat)
+        result["smus"] = n_smus
+        result["sweep_type"] = params["sweep_type"]
+        result["pulsed"] = params["pulsed"]
+        results["cases"][name] = result
+
+        print(
+            f"{name:<20} {result['points']:>8d} points "
+            f"{result['wall_time']:>8.3f} s {result['points_per_s']:>10.0f} points/s "
+            f"{result['peak_memory'] / 1e6:>8.1f} MB"
+        )
+
+    thread.stop()
+    canvas.close()
+    app.quit()
+    journal_dir.cleanup()
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    print(f"\nResults saved to {args.output}.")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+
+    main()
@@ -1,6 +1,14 @@
 import keithleygui.config
-from keithleygui.main import KeithleyGuiApp
-
 
 __version__ = "v1.2.1"
 __author__ = "Sam Schott"
+
+
+def __getattr__(name):
+    # import the GUI lazily so that headless use does not load PyQt5
+    if name == "KeithleyGuiApp":
+        from keithleygui.main import KeithleyGuiApp
+
+        return KeithleyGuiApp
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © keithleygui Project Contributors
+# Licensed under the terms of the MIT License
+# (see LICENSE.txt for details)
+
+"""
+Capability profiles of Keithley instruments.
+
+A profile holds the model, serial number, SMU names, power line frequency and source
+ranges of an instrument. Profiles are saved in the config folder, keyed by VISA
+address, so that they only need to be discovered again when a different instrument
+is found at an address.
+"""
+
+# system imports
+import os
+import json
+import logging
+
+# local imports
+from keithleygui.config.base import get_conf_path, file_lock
+from keithleygui.config.main import SUBFOLDER
+
+PROFILE_FILE = "instruments.json"
+
+logger = logging.getLogger(__name__)
+
+# source ranges of the 2600B series by model family, voltages in V, currents in A
+MODEL_RANGES = {
+    "260": {
+        "voltage": [0.1, 1, 6, 40],
+        "current": [1e-7, 1e-6, 1e-5, 1e-4, 1e-3, 1e-2, 0.1, 1, 3],
+    },
+    "261": {
+        "voltage": [0.2, 2, 20, 200],
+        "current": [1e-7, 1e-6, 1e-5, 1e-4, 1e-3, 1e-2, 0.1, 1, 1.5],
+    },
+    "263": {
+        "voltage": [0.2, 2, 20, 200],
+        "current": [1e-9, 1e-8, 1e-7, 1e-6, 1e-5, 1e-4, 1e-3, 1e-2, 0.1, 1, 1.5],
+    },
+}
+
+
+class InstrumentProfile:
+    """
+    Capabilities of a Keithley instrument.
+
+    :param model: Model number, e.g., "2602B".
+    :param serialno: Serial number.
+    :param smus: List of SMU names.
+    :param linefreq: Power line frequency in Hz.
+    :param ranges: Dictionary with lists of "voltage" and "current" source ranges or
+        ``None`` if unknown for the model.
+    """
+
+    def __init__(self, model, serialno, smus, linefreq, ranges=None):
+        self.model = str(model)
+        self.serialno = str(serialno)
+        self.smus = list(smus)
+        self.linefreq = float(linefreq)
+        self.ranges = ranges
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}({self.model}, {self.serialno})>"
+
+    @classmethod
+    def discover(cls, keithley, model=None, serialno=None):
+        """Queries the capabilities of a connected Keithley."""
+
+        if model is None:
+            model = keithley.localnode.model
+        if serialno is None:
+            serialno = keithley.localnode.serialno
+
+        smus = [name for name in dir(keithley) if name.startswith("smu")]
+        linefreq = keithley.localnode.linefreq
+
+        return cls(model, serialno, smus, linefreq, model_ranges(model))
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["model"], d["serialno"], d["smus"], d["linefreq"], d["ranges"])
+
+    def to_dict(self):
+        return dict(
+            model=self.model,
+            serialno=self.serialno,
+            smus=self.smus,
+            linefreq=self.linefreq,
+            ranges=self.ranges,
+        )
+
+    def matches(self, model, serialno):
+        """Returns ``True`` if the profile belongs to the given instrument."""
+        return self.model == str(model) and self.serialno == str(serialno)
+
+    @property
+    def max_voltage(self):
+        """Largest voltage source range in V or ``None`` if unknown."""
+        if self.ranges:
+            return max(self.ranges["voltage"])
+
+
+def model_ranges(model):
+    """Returns the source ranges of a Keithley model or ``None`` if unknown."""
+    ranges = MODEL_RANGES.get(str(model)[:3])
+
+    if ranges is not None:
+        return {key: list(values) for key, values in ranges.items()}
+
+
+def _profile_path():
+    return get_conf_path(SUBFOLDER, PROFILE_FILE)
+
+
+def _load_profiles():
+    try:
+        with open(_profile_path()) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return dict()
+
+
+def load_profile(visa_address):
+    """
+    Returns the saved profile for a VISA address without talking to the instrument.
+
+    :param visa_address: VISA address of the instrument.
+    :returns: :class:`InstrumentProfile` or ``None`` if no valid profile is saved.
+    """
+    try:
+        return InstrumentProfile.from_dict(_load_profiles()[visa_address])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def save_profile(visa_address, profile):
+    """Saves the profile for a VISA address, replacing any previous profile."""
+
+    path = _profile_path()
+    tmp_path = path + ".tmp"
+
+    # other keithleygui instances may save profiles at the same time
+    try:
+        with file_lock(path + ".lock"):
+            profiles = _load_profiles()
+            profiles[visa_address] = profile.to_dict()
+
+            with open(tmp_path, "w") as f:
+                json.dump(profiles, f, indent=2)
+            os.replace(tmp_path, path)
+    except OSError as exc:
+        logger.warning("Could not save instrument profile: %s", exc)
+
+
+def get_profile(keithley):
+    """
+    Returns the capability profile of a connected Keithley. Only the model and serial
+    number are queried if a matching profile has been saved before.
+
+    :param keithley: Connected Keithley2600 instance.
+    :returns: :class:`InstrumentProfile`.
+    """
+
+    model = keithley.localnode.model
+    serialno = keithley.localnode.serialno
+
+    profile = load_profile(keithley.visa_address)
+
+    if profile is None or not profile.matches(model, serialno):
+        logger.info("Discovering capabilities of Keithley %s", model)
+        profile = InstrumentProfile.discover(keithley, model, serialno)
+        save_profile(keithley.visa_address, profile)
+
+    return profile
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © keithleygui Project Contributors
+# Licensed under the terms of the MIT License
+# (see LICENSE.txt for details)
+
+"""
+Command line entry point. Starts the GUI by default. The "run" command runs a recipe
+of sweeps without the GUI and does not import PyQt5. The "export" command saves plots
+of sweep data files as images without showing the GUI.
+"""
+
+# system imports
+import sys
+import time
+import logging
+import argparse
+
+
+def run_recipe_command(args):
+    """Connects to the Keithley and runs all sweeps of a recipe."""
+
+    from keithleygui.config.main import CONF
+    from keithleygui.recipe import load_recipe, run_recipe, RecipeError
+    from keithleygui.simulation import create_keithley, SIMULATION_LIBRARY
+
+    try:
+        jobs = load_recipe(args.recipe, args.output)
+    except (OSError, RecipeError) as exc:
+        print(f"Cannot load recipe: {exc}", file=sys.stderr)
+        return 2
+
+    address = args.address or CONF.get("Connection", "VISA_ADDRESS")
+    lib = args.library
+
+    if args.simulate:
+        lib = SIMULATION_LIBRARY
+    elif lib is None:
+        lib = CONF.get("Connection", "VISA_LIBRARY")
+
+    keithley = create_keithley(address, lib)
+
+    if not keithley.connected:
+        print(f"Keithley cannot be reached at {address}.", file=sys.stderr)
+        return 1
+
+    try:
+        n_failed = run_recipe(keithley, jobs)
+    except KeyboardInterrupt:
+        print("Aborted.", file=sys.stderr)
+        return 130
+    finally:
+        keithley.disconnect()
+
+    return 1 if n_failed > 0 else 0
+
+
+def export_command(args):
+    """Exports plots of saved sweep data files."""
+
+    from keithleygui.export import export_plots
+
+    try:
+        width, height = (int(n) for n in args.size.lower().split("x"))
+    except ValueError:
+        print(f"Invalid size '{args.size}', use WIDTHxHEIGHT.", file=sys.stderr)
+        return 2
+
+    n_failed = 0
+    n_files = len(args.files)
+
+    results = export_plots(
+        args.files, args.output, args.format, (width, height), args.jobs
+    )
+
+    try:
+        for i, result in enumerate(results, start=1):
+            if result.ok:
+                print(f"[{i}/{n_files}] {', '.join(result.out_paths)}", flush=True)
+            else:
+                n_failed += 1
+                print(f"[{i}/{n_files}] {result.path}: {result.error}", flush=True)
+    except KeyboardInterrupt:
+        print("Aborted.", file=sys.stderr)
+        return 130
+
+    return 1 if n_failed > 0 else 0
+
+
+def run():
+
+    parser = argparse.ArgumentParser(
+        prog="keithleygui", description="A GUI for the Keithley 2600 series."
+    )
+    parser.add_argument(
+        "-v", "--verbose", help="increase output verbosity", action="store_true"
+    )
+    parser.add_argument(
+        "--simulate",
+        help="use a simulated Keithley instead of a connected instrument",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--profile-startup",
+        help="print how long the GUI takes to start up and quit",
+        action="store_true",
+    )
+    subparsers = parser.add_subparsers(dest="command", title="commands")
+    subparsers.add_parser("gui", help="start the graphical user interface (default)")
+
+    parser_run = subparsers.add_parser(
+        "run", help="run a recipe of sweeps without the graphical user interface"
+    )
+    parser_run.add_argument("recipe", help="JSON file with a list of sweeps")
+    parser_run.add_argument(
+        "-o", "--output", default=".", help="directory to save sweep data in"
+    )
+    parser_run.add_argument(
+        "-a", "--address", help="VISA address of the Keithley (default: from config)"
+    )
+    parser_run.add_argument(
+        "-l",
+        "--library",
+        help="VISA library to use, '@sim' for a simulated Keithley (default: from "
+        "config)",
+    )
+
+    parser_export = subparsers.add_parser(
+        "export", help="export plots of saved sweep data without the user interface"
+    )
+    parser_export.add_argument("files", nargs="+", help="sweep data files")
+    parser_export.add_argument(
+        "-o",
+        "--output",
+        help="directory to save images in (default: next to the data files)",
+    )
+    parser_export.add_argument(
+        "-f", "--format", choices=["png", "svg"], default="png", help="image format"
+    )
+    parser_export.add_argument(
+        "-s", "--size", default="800x600", help="image size in pixels, WIDTHxHEIGHT"
+    )
+    parser_export.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        help="number of files to export in parallel (default: number of CPUs)",
+    )
+
+    args = parser.parse_args()
+
+    if args.verbose:
+        from keithley2600 import log_to_screen
+
+        log_to_screen()
+
+        # show sweep timings and other messages from keithleygui
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s %(name)s: %(message)s"))
+        logger = logging.getLogger("keithleygui")
+        logger.setLevel(logging.INFO)
+        logger.addHandler(handler)
+
+    if args.command == "run":
+        sys.exit(run_recipe_command(args))
+    elif args.command == "export":
+        sys.exit(export_command(args))
+    else:
+        t0 = time.perf_counter()
+
+        from keithleygui.main import launch_gui
+        from keithleygui.measurement import PhaseTimer
+
+        timer = None
+        keithley = None
+
+        if args.profile_startup:
+            timer = PhaseTimer()
+            timer.add("imports", time.perf_counter() - t0)
+
+        if args.simulate:
+            from keithleygui.simulation import SimulatedKeithley2600
+
+            keithley = SimulatedKeithley2600()
+
+        exit_code = launch_gui(keithley, startup_timer=timer)
+
+        if args.profile_startup:
+            sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+
+    run()
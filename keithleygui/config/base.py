@@ -16,6 +16,14 @@ from __future__ import division, absolute_import
 import os.path as osp
 import os
 import shutil
+import contextlib
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    import msvcrt
+
+    fcntl = None
 
 
 # =============================================================================
@@ -71,6 +79,34 @@ def get_conf_path(subfolder=None, filename=None):
         return osp.join(conf_dir, filename)
 
 
+# =============================================================================
+# File locking
+# =============================================================================
+
+
+@contextlib.contextmanager
+def file_lock(fname):
+    """
+    Context manager which holds an exclusive lock on the given lock file, so that
+    config files can be read and written safely by several processes.
+    """
+    with open(fname, "a+") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            # retries for 10 sec before raising an OSError
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
 # =============================================================================
 # Reset config files
 # =============================================================================
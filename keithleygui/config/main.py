@@ -9,7 +9,7 @@ keithleygui configuration options.
 """
 
 # Local import
-from keithleygui.config.user import UserConfig
+from keithleygui.config.user import UserConfig, LazyConfig
 
 PACKAGE_NAME = "keithleygui"
 SUBFOLDER = ".%s" % PACKAGE_NAME
@@ -54,6 +54,21 @@ DEFAULTS = [
             "drain": "smub",
         },
     ),
+    (
+        "Sequencer",
+        {
+            "directory": "~",
+            "template": "{index:02d}_{sweep_type}_{time}.txt",
+        },
+    ),
+    (
+        "AutoSave",
+        {
+            "enabled": False,
+            "directory": "~",
+            "template": "{sweep_type}_{smu_gate}-{smu_drain}_{time}.txt",
+        },
+    ),
     (
         "smua",
         {
@@ -87,24 +102,30 @@ DEFAULTS = [
 # 3. You don't need to touch this value if you're just adding a new option
 CONF_VERSION = "4.0.0"
 
-# Main configuration instance
-try:
-    CONF = UserConfig(
-        PACKAGE_NAME,
-        defaults=DEFAULTS,
-        load=True,
-        version=CONF_VERSION,
-        subfolder=SUBFOLDER,
-        backup=True,
-        raw_mode=True,
-    )
-except Exception:
-    CONF = UserConfig(
-        PACKAGE_NAME,
+
+def create_config(in_memory=False):
+    """
+    Create the keithleygui configuration. If ``in_memory`` is True, the configuration
+    only holds the defaults and is never read from or saved to disk. This is useful
+    for tests and scripts which should not depend on or change the user's settings.
+    """
+    kwargs = dict(
         defaults=DEFAULTS,
-        load=False,
         version=CONF_VERSION,
         subfolder=SUBFOLDER,
         backup=True,
         raw_mode=True,
     )
+
+    if in_memory:
+        return UserConfig(PACKAGE_NAME, load=False, in_memory=True, **kwargs)
+
+    try:
+        return UserConfig(PACKAGE_NAME, load=True, **kwargs)
+    except Exception:
+        return UserConfig(PACKAGE_NAME, load=False, **kwargs)
+
+
+# Main configuration instance, loaded from disk on first use. Call
+# ``CONF.setup(in_memory=True)`` before the first use to keep it in memory instead.
+CONF = LazyConfig(create_config)
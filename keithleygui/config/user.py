@@ -12,18 +12,20 @@ It's based on the ConfigParser module (present in the standard library).
 
 # Std imports
 import ast
+import copy
 import os
 import os.path as osp
 import sys
 import re
 import shutil
-import time
 import codecs
+import filecmp
+import threading
+import contextlib
 import configparser as cp
-from distutils.version import LooseVersion
 
 # Local imports
-from keithleygui.config.base import get_conf_path, get_home_dir
+from keithleygui.config.base import get_conf_path, get_home_dir, file_lock
 
 PY2 = sys.version[0] == "2"
 
@@ -69,6 +71,9 @@ def check_version(actver, version, cmp_op):
 
     Distributed under the terms of the BSD License.
     """
+    # imported here since distutils is slow to import and only needed after updates
+    from distutils.version import LooseVersion
+
     if isinstance(actver, tuple):
         actver = ".".join([str(i) for i in actver])
 
@@ -137,6 +142,26 @@ class DefaultsConfig(cp.ConfigParser):
 
         self.optionxform = str
 
+        # number of open batches and whether changes are waiting to be saved
+        self._batch_level = 0
+        self._batch_changed = False
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Context manager which collects all changes and saves them to the .ini file
+        once on exit, instead of once per change. Batches can be nested, only the
+        outermost batch saves.
+        """
+        self._batch_level += 1
+        try:
+            yield self
+        finally:
+            self._batch_level -= 1
+            if self._batch_level == 0 and self._batch_changed:
+                self._batch_changed = False
+                self._save()
+
     def _set(self, section, option, value, verbose):
         """
         Private set method
@@ -151,34 +176,35 @@ class DefaultsConfig(cp.ConfigParser):
 
     def _save(self):
         """
-        Save config into the associated .ini file
+        Save config into the associated .ini file. Within a batch, saving is
+        deferred until the batch is closed.
         """
-        # See Issue 1086 and 1242 for background on why this
-        # method contains all the exception handling.
+        if self._batch_level > 0:
+            self._batch_changed = True
+            return
+
         fname = self.filename()
+        tmp_fname = "%s.tmp" % fname
 
-        def _write_file(fname):
-            if PY2:
-                # Python 2
-                with codecs.open(fname, "w", encoding="utf-8") as configfile:
-                    self.write(configfile)
-            else:
-                # Python 3
-                with open(fname, "w", encoding="utf-8") as configfile:
+        # lock the file against other processes, merge their changes and write to a
+        # temporary file which replaces the .ini file, so that it is never left
+        # empty or incomplete
+        try:
+            with file_lock("%s.lock" % fname):
+                self._merge_saved(fname)
+                with open(tmp_fname, "w", encoding="utf-8") as configfile:
                     self.write(configfile)
+                os.replace(tmp_fname, fname)
+        except Exception as e:
+            print("Failed to write user configuration file.")
+            print("Please submit a bug report.")
+            raise (e)
 
-        try:  # the "easy" way
-            _write_file(fname)
-        except IOError:
-            try:  # the "delete and sleep" way
-                if osp.isfile(fname):
-                    os.remove(fname)
-                time.sleep(0.05)
-                _write_file(fname)
-            except Exception as e:
-                print("Failed to write user configuration file.")
-                print("Please submit a bug report.")
-                raise (e)
+    def _merge_saved(self, fname):
+        """
+        Merge changes saved to the .ini file by other processes before saving
+        """
+        pass
 
     def filename(self):
         """Create a .ini filename located in user home directory.
@@ -204,6 +230,44 @@ class DefaultsConfig(cp.ConfigParser):
                 self._set(section, option, new_value, False)
 
 
+# =============================================================================
+# Lazy config class
+# =============================================================================
+
+
+class LazyConfig:
+    """
+    Proxy which creates a config with the given factory on first use, so that
+    importing a module with a config instance does not read or write any files
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._config = None
+        self._lock = threading.Lock()
+
+    def setup(self, **kwargs):
+        """
+        Create the config now, passing kwargs to the factory. Raises a RuntimeError
+        if the config has already been created.
+        """
+        with self._lock:
+            if self._config is not None:
+                raise RuntimeError("Config has already been created")
+            self._config = self._factory(**kwargs)
+        return self._config
+
+    def _get_config(self):
+        if self._config is None:
+            with self._lock:
+                if self._config is None:
+                    self._config = self._factory()
+        return self._config
+
+    def __getattr__(self, name):
+        return getattr(self._get_config(), name)
+
+
 # =============================================================================
 # User config class
 # =============================================================================
@@ -217,6 +281,7 @@ class UserConfig(DefaultsConfig):
               *or* list of tuples (section_name, options)
     version: version of the configuration file (X.Y.Z format)
     subfolder: configuration file will be saved in %home%/subfolder/%name%.ini
+    in_memory: if True, the configuration is never read from or saved to disk
 
     Note that 'get' and 'set' arguments number and type
     differ from the overriden methods
@@ -234,24 +299,30 @@ class UserConfig(DefaultsConfig):
         backup=False,
         raw_mode=False,
         remove_obsolete=False,
+        in_memory=False,
     ):
         DefaultsConfig.__init__(self, name, subfolder)
         self.raw = 1 if raw_mode else 0
+        self.in_memory = in_memory
         if version is not None and re.match(r"^(\d+).(\d+).(\d+)$", version) is None:
             raise ValueError(
                 "Version number %r is incorrect - must be in X.Y.Z format" % version
             )
         if isinstance(defaults, dict):
             defaults = [(self.DEFAULT_SECTION_NAME, defaults)]
+        # decoded values returned by 'get', by (section, option)
+        self._values = dict()
+        # (section, option) changed since loading or saving, option is None if the
+        # whole section has been removed
+        self._changed = set()
         self.defaults = defaults
         if defaults is not None:
             self.reset_to_defaults(save=False)
+        if in_memory:
+            return
         fname = self.filename()
         if backup:
-            try:
-                shutil.copyfile(fname, "%s.bak" % fname)
-            except IOError:
-                pass
+            self._backup(fname, "%s.bak" % fname)
         if load:
             # If config file already exists, it overrides Default options:
             self.load_from_ini()
@@ -280,6 +351,32 @@ class UserConfig(DefaultsConfig):
                 # If no defaults are defined, set .ini file settings as default
                 self.set_as_defaults()
 
+    @property
+    def defaults(self):
+        """List of tuples (section_name, options) with default values"""
+        return self._default_list
+
+    @defaults.setter
+    def defaults(self, defaults):
+        self._default_list = defaults
+        # index of default options by section, the first section of a name wins
+        self._default_index = dict()
+        for section, options in defaults or []:
+            self._default_index.setdefault(section, options)
+        self._values.clear()
+
+    @staticmethod
+    def _backup(fname, backup_fname):
+        """Copy the .ini file to a backup file unless it is already up to date"""
+        try:
+            if osp.isfile(backup_fname) and filecmp.cmp(
+                fname, backup_fname, shallow=False
+            ):
+                return
+            shutil.copyfile(fname, backup_fname)
+        except IOError:
+            pass
+
     def get_version(self, version="0.0.0"):
         """Return configuration (not application!) version"""
         return self.get(self.DEFAULT_SECTION_NAME, "version", version)
@@ -298,6 +395,8 @@ class UserConfig(DefaultsConfig):
                 try:
                     with codecs.open(fname, encoding="utf-8") as configfile:
                         self.readfp(configfile)
+                    self._values.clear()
+                    self._changed.clear()
                 except IOError:
                     print("Failed reading file", fname)
 
@@ -359,12 +458,13 @@ class UserConfig(DefaultsConfig):
         """
         Set defaults from the current config
         """
-        self.defaults = []
+        defaults = []
         for section in self.sections():
             secdict = {}
             for option, value in self.items(section, raw=self.raw):
                 secdict[option] = value
-            self.defaults.append((section, secdict))
+            defaults.append((section, secdict))
+        self.defaults = defaults
 
     def reset_to_defaults(self, save=True, verbose=False, section=None):
         """
@@ -396,12 +496,7 @@ class UserConfig(DefaultsConfig):
         -> useful for type checking in 'get' method
         """
         section = self._check_section_option(section, option)
-        for sec, options in self.defaults:
-            if sec == section:
-                if option in options:
-                    return options[option]
-        else:
-            return NoDefault
+        return self._default_index.get(section, {}).get(option, NoDefault)
 
     def get(self, section, option, default=NoDefault):
         """
@@ -412,6 +507,14 @@ class UserConfig(DefaultsConfig):
         """
         section = self._check_section_option(section, option)
 
+        try:
+            value = self._values[(section, option)]
+        except KeyError:
+            pass
+        else:
+            # don't hand out the cached lists and dicts themselves
+            return copy.copy(value)
+
         if not self.has_section(section):
             if default is NoDefault:
                 raise cp.NoSectionError(section)
@@ -454,7 +557,16 @@ class UserConfig(DefaultsConfig):
                 value = ast.literal_eval(value)
             except (SyntaxError, ValueError):
                 pass
-        return value
+        self._values[(section, option)] = value
+        return copy.copy(value)
+
+    def get_section(self, section):
+        """
+        Get all options of a section as a dictionary of decoded values
+        """
+        if not self.has_section(section):
+            raise cp.NoSectionError(section)
+        return {option: self.get(section, option) for option in self.options(section)}
 
     def set_default(self, section, option, default_value):
         """
@@ -465,6 +577,7 @@ class UserConfig(DefaultsConfig):
         for sec, options in self.defaults:
             if sec == section:
                 options[option] = default_value
+        self._values.pop((section, option), None)
 
     def set(self, section, option, value, verbose=False, save=True):
         """
@@ -493,10 +606,53 @@ class UserConfig(DefaultsConfig):
         if save:
             self._save()
 
+    def _set(self, section, option, value, verbose):
+        """
+        Private set method
+        """
+        self._values.pop((section, option), None)
+        self._changed.add((section, option))
+        DefaultsConfig._set(self, section, option, value, verbose)
+
+    def _save(self):
+        """
+        Save config into the associated .ini file unless it is kept in memory
+        """
+        if not self.in_memory:
+            DefaultsConfig._save(self)
+
+    def _merge_saved(self, fname):
+        """
+        Merge changes saved to the .ini file by other processes before saving.
+        Options changed by this instance take precedence.
+        """
+        saved = cp.ConfigParser(interpolation=None)
+        saved.optionxform = str
+        try:
+            saved.read(fname, encoding="utf-8")
+        except cp.Error:
+            return
+
+        for section in saved.sections():
+            if (section, None) in self._changed:
+                continue
+            for option, value in saved.items(section, raw=True):
+                if (section, option) not in self._changed:
+                    if not self.has_section(section):
+                        self.add_section(section)
+                    cp.ConfigParser.set(self, section, option, value)
+
+        self._values.clear()
+        self._changed.clear()
+
     def remove_section(self, section):
         cp.ConfigParser.remove_section(self, section)
+        self._values.clear()
+        self._changed.add((section, None))
         self._save()
 
     def remove_option(self, section, option):
         cp.ConfigParser.remove_option(self, section, option)
+        self._values.pop((section, option), None)
+        self._changed.add((section, option))
         self._save()
@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © keithleygui Project Contributors
+# Licensed under the terms of the MIT License
+# (see LICENSE.txt for details)
+
+"""
+Saving and loading of sweep data.
+
+Sweeps are saved as tab-delimited text by :meth:`keithley2600.FETResultTable.save` or,
+for paths ending in ".npz", to a NumPy archive. An archive holds any number of sweeps.
+For each sweep, it stores the data as a float array with one row per column of the
+sweep and the column titles, units and sweep parameters as JSON. Archives can be
+read with ``numpy.load`` without pickling.
+
+While a sweep is recorded, each completed sub-sweep is appended to a journal file
+ending in ".part" by :class:`SweepJournal`. The journal is removed once the sweep has
+been saved. If the sweep fails or the program crashes, it keeps all sub-sweeps which
+were completed and can be loaded with :func:`load_sweeps`.
+"""
+
+# system imports
+import os
+import json
+import time
+import shutil
+import struct
+import zipfile
+
+# external imports
+import numpy as np
+from keithley2600 import FETResultTable
+
+NPZ_EXT = ".npz"
+JOURNAL_EXT = ".part"
+
+# max time in sec between forcing journal writes to disk
+FSYNC_INTERVAL = 5.0
+
+# measured values are noise in their lowest digits and deflating them saves little
+# space but makes saving and loading many times slower
+COMPRESSION = zipfile.ZIP_STORED
+
+# file formats for dialogs, by extension
+FORMATS = {
+    ".txt": "Text file",
+    NPZ_EXT: "NumPy archive",
+}
+
+
+def is_npz(path):
+    return os.path.splitext(path)[1].lower() == NPZ_EXT
+
+
+def is_journal(path):
+    return os.path.splitext(path)[1].lower() == JOURNAL_EXT
+
+
+def save_sweep(sweep_data, path, append=False):
+    """
+    Saves sweep data as text or to a NumPy archive if ``path`` ends in ".npz".
+
+    :param sweep_data: :class:`keithley2600.FETResultTable` to save.
+    :param path: Path of the file.
+    :param append: If ``True``, the sweep is added to an existing archive instead of
+        replacing it. Text files are always replaced.
+    """
+
+    if not is_npz(path):
+        sweep_data.save(path)
+        return
+
+    tmp_path = path + ".tmp"
+
+    # appending overwrites the archive's index, append to a copy so that the archive
+    # stays intact if writing fails
+    if append and os.path.isfile(path):
+        shutil.copyfile(path, tmp_path)
+        with zipfile.ZipFile(tmp_path, "a", COMPRESSION) as f:
+            _write_sweep(f, sweep_data, _count_sweeps(f))
+    else:
+        with zipfile.ZipFile(tmp_path, "w", COMPRESSION) as f:
+            _write_sweep(f, sweep_data, 0)
+
+    os.replace(tmp_path, path)
+
+
+def load_sweeps(path, mmap=False):
+    """
+    Loads all sweeps from a text file, a NumPy archive or a journal.
+
+    :param path: Path of the file.
+    :param mmap: If ``True``, the data of sweeps in a NumPy archive is memory-mapped
+        instead of read, so that only the parts which are accessed are read from disk.
+        Text files and journals are always read completely.
+    :returns: List of :class:`keithley2600.FETResultTable` instances, in the order in
+        which they were saved.
+    """
+
+    if is_journal(path):
+        return [load_journal(path)]
+
+    if not is_npz(path):
+        sweep_data = FETResultTable()
+        sweep_data.load(path)
+        return [sweep_data]
+
+    sweeps = []
+
+    with np.load(path, allow_pickle=False) as archive, zipfile.ZipFile(path) as f:
+        n_sweeps = len([name for name in archive.files if name.endswith("_meta")])
+
+        for index in range(n_sweeps):
+            data = None
+            if mmap:
+                data = _map_array(path, f.getinfo(f"{index:04d}_data.npy"))
+            sweeps.append(_read_sweep(archive, index, data))
+
+    return sweeps
+
+
+def _count_sweeps(f):
+    return len([name for name in f.namelist() if name.endswith("_meta.npy")])
+
+
+def _write_sweep(f, sweep_data, index):
+
+    meta = dict(
+        column_names=sweep_data.column_names,
+        column_units=sweep_data.column_units,
+        params=sweep_data.params,
+    )
+    meta = json.dumps(meta, default=str)
+    data = np.asarray(sweep_data.data, dtype=float).reshape(-1, sweep_data.ncols)
+
+    # store columns contiguously so that a single column is read without strides
+    arrays = {"data": np.ascontiguousarray(data.T), "meta": np.array(meta)}
+
+    for key, array in arrays.items():
+        with f.open(f"{index:04d}_{key}.npy", "w", force_zip64=True) as member:
+            np.lib.format.write_array(member, array, allow_pickle=False)
+
+
+def _read_sweep(archive, index, data=None):
+
+    meta = json.loads(str(archive[f"{index:04d}_meta"]))
+
+    if data is None:
+        data = archive[f"{index:04d}_data"]
+
+    sweep_data = FETResultTable(
+        meta["column_names"], meta["column_units"], params=meta["params"]
+    )
+    # assign the data instead of passing it to FETResultTable which copies it
+    sweep_data.data = data.T
+
+    return sweep_data
+
+
+def _map_array(path, info):
+    """
+    Memory-maps an array which is stored uncompressed in a NumPy archive. Returns
+    ``None`` if the array is compressed or holds Python objects.
+    """
+
+    if info.compress_type != zipfile.ZIP_STORED:
+        return None
+
+    with open(path, "rb") as f:
+        # the local header of a member has a fixed size of 30 bytes, followed by the
+        # file name and an extra field whose lengths are stored at its end
+        f.seek(info.header_offset)
+        n_name, n_extra = struct.unpack("<HH", f.read(30)[26:30])
+        f.seek(info.header_offset + 30 + n_name + n_extra)
+
+        version = np.lib.format.read_magic(f)
+
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+
+        offset = f.tell()
+
+    if dtype.hasobject:
+        return None
+
+    order = "F" if fortran_order else "C"
+
+    return np.memmap(path, dtype, "r", offset, shape, order)
+
+
+class SweepJournal:
+    """
+    Append-only file which holds the columns of a sweep as they are recorded. Each
+    call of :meth:`write` appends the columns which are new since the last call, so
+    that the file always holds all completed sub-sweeps. Writes are flushed
+    immediately and forced to disk at least every :data:`FSYNC_INTERVAL` sec.
+
+    The file is a sequence of NumPy arrays: a JSON string with the titles and units of
+    the new columns, followed by the columns as a float array with one row per
+    column. The first JSON string also holds the sweep parameters.
+
+    :param path: Path of the journal file, should end in ".part".
+
+    :cvar ncols: Number of columns written so far.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.ncols = 0
+        self._last_fsync = time.monotonic()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._file = open(path, "wb")
+
+    def write(self, sweep_data):
+        """Appends the columns of ``sweep_data`` which have not been written yet."""
+
+        if sweep_data.ncols <= self.ncols:
+            return
+
+        new = slice(self.ncols, sweep_data.ncols)
+        meta = dict(
+            column_names=sweep_data.column_names[new],
+            column_units=sweep_data.column_units[new],
+        )
+        if self.ncols == 0:
+            meta["params"] = sweep_data.params
+
+        data = np.asarray(sweep_data.data, dtype=float).reshape(-1, sweep_data.ncols)
+        columns = np.ascontiguousarray(data[:, new].T)
+
+        meta = np.array(json.dumps(meta, default=str))
+        np.lib.format.write_array(self._file, meta, allow_pickle=False)
+        np.lib.format.write_array(self._file, columns, allow_pickle=False)
+
+        self.ncols = sweep_data.ncols
+        self._file.flush()
+
+        if time.monotonic() - self._last_fsync > FSYNC_INTERVAL:
+            self._fsync()
+
+    def close(self):
+        """Forces all writes to disk and closes the journal."""
+        if not self._file.closed:
+            self._fsync()
+            self._file.close()
+
+    def _fsync(self):
+        os.fsync(self._file.fileno())
+        self._last_fsync = time.monotonic()
+
+
+def load_journal(path):
+    """
+    Loads the sweep data from a journal. A record which was only partly written,
+    e.g., because the program crashed, is ignored.
+
+    :param path: Path of a file written by :class:`SweepJournal`.
+    :returns: :class:`keithley2600.FETResultTable` with all complete sub-sweeps.
+    """
+
+    names, units, columns, params = [], [], [], dict()
+
+    with open(path, "rb") as f:
+        while True:
+            try:
+                meta = json.loads(str(np.lib.format.read_array(f)))
+                data = np.lib.format.read_array(f)
+            except (ValueError, EOFError):
+                break  # end of file or incomplete record
+
+            names += meta["column_names"]
+            units += meta["column_units"]
+            params.update(meta.get("params", {}))
+            columns.append(data)
+
+    data = np.concatenate(columns).T if columns else None
+
+    return FETResultTable(names, units, data, params)
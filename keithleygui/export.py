@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © keithleygui Project Contributors
+# Licensed under the terms of the MIT License
+# (see LICENSE.txt for details)
+
+"""
+Headless export of saved sweep data as images.
+
+Every sweep is plotted with the styling of the GUI by an offscreen
+:class:`keithleygui.pyqtplot_canvas.SweepDataPlot` and saved as PNG or SVG. Archives
+with several sweeps are saved as one image per sweep. Files are
+spread over a pool of worker processes, each with its own QApplication and a single
+plot which is reused for all of its files. PyQt5 is only imported by the workers.
+"""
+
+# system imports
+import os
+import os.path as osp
+import concurrent.futures
+
+# local imports
+from keithleygui.datafile import load_sweeps
+
+FORMATS = ["png", "svg"]
+
+# size of the exported plots in pixels
+DEFAULT_SIZE = (800, 600)
+
+# QApplication and plot of a worker process, created by _init_worker
+_app = None
+_canvas = None
+
+
+class ExportResult:
+    """
+    Outcome of exporting a single file.
+
+    :param path: Path of the sweep data file.
+    :param out_paths: Paths of the exported images.
+    :param error: Error message if the export failed, ``None`` otherwise.
+    """
+
+    def __init__(self, path, out_paths, error=None):
+        self.path = path
+        self.out_paths = out_paths
+        self.error = error
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}({self.path}, error={self.error!r})>"
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+def export_path(path, output_dir=None, fmt="png"):
+    """
+    Returns the path of the image for a sweep data file. The image is saved next to
+    the data file if no output directory is given.
+    """
+    root, _ = osp.splitext(osp.basename(path))
+    folder = osp.dirname(path) if output_dir is None else output_dir
+    return osp.join(folder, f"{root}.{fmt}")
+
+
+def export_paths(paths, output_dir=None, fmt="png"):
+    """
+    Returns the paths of the images for several sweep data files. If files would be
+    exported to the same image, e.g., "a/x.txt" and "b/x.txt" to the same output
+    directory or "x.txt" and "x.npz", the lowest free counter is appended to the
+    names of all but the first one instead of overwriting it. The counter is separated
+    by "-" since "_" is used for the index of sweeps in archives.
+    """
+
+    out_paths = []
+    taken = set()
+
+    for path in paths:
+        out_path = export_path(path, output_dir, fmt)
+        root, ext = osp.splitext(out_path)
+        counter = 1
+
+        while osp.abspath(out_path) in taken:
+            counter += 1
+            out_path = f"{root}-{counter}{ext}"
+
+        taken.add(osp.abspath(out_path))
+        out_paths.append(out_path)
+
+    return out_paths
+
+
+def export_plots(paths, output_dir=None, fmt="png", size=DEFAULT_SIZE, processes=None):
+    """
+    Exports plots of sweep data files in parallel.
+
+    :param paths: Paths of text files or NumPy archives with sweep data.
+    :param output_dir: Directory to save the images in. Images are saved next to the
+        data files if ``None``.
+    :param fmt: Image format, "png" or "svg".
+    :param size: Tuple (width, height) of the plots in pixels.
+    :param processes: Number of worker processes. Defaults to the number of CPUs.
+    :returns: Iterator over an :class:`ExportResult` per file, in the order of
+        ``paths``. Files are exported while iterating.
+    """
+
+    if fmt not in FORMATS:
+        raise ValueError(f"Format must be one of {FORMATS}, got '{fmt}'.")
+
+    paths = list(paths)
+    processes = min(processes or os.cpu_count() or 1, max(len(paths), 1))
+
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+
+    out_paths = export_paths(paths, output_dir, fmt)
+    tasks = [(path, out_path, fmt) for path, out_path in zip(paths, out_paths)]
+
+    return _run_tasks(tasks, size, processes)
+
+
+def _run_tasks(tasks, size, processes):
+
+    # several files per task to amortize the round-trips to the workers, but small
+    # enough chunks to keep all workers busy until the end
+    chunksize = max(len(tasks) // (processes * 8), 1)
+
+    with concurrent.futures.ProcessPoolExecutor(
+        processes, initializer=_init_worker, initargs=(size,)
+    ) as executor:
+        yield from executor.map(_export_task, tasks, chunksize=chunksize)
+
+
+def _init_worker(size):
+    """Creates the QApplication and plot of a worker process."""
+
+    global _app, _canvas
+
+    # render without a display, also if one is available
+    os.environ["QT_QPA_PLATFORM"] = "offscreen"
+
+    from PyQt5 import QtWidgets
+    from keithleygui.pyqtplot_canvas import SweepDataPlot
+
+    _app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+    _canvas = SweepDataPlot()
+    _canvas.resize(*size)
+    _canvas.show()
+    _app.processEvents()
+
+
+def _export_task(task):
+    path, out_path, fmt = task
+
+    try:
+        out_paths = export_plot(path, out_path, fmt)
+    except Exception as exc:
+        return ExportResult(path, [], f"{exc.__class__.__name__}: {exc}")
+
+    return ExportResult(path, out_paths)
+
+
+def export_plot(path, out_path, fmt="png"):
+    """
+    Plots all sweeps of a sweep data file and saves the plots as images. Must be called
+    from a worker process of :func:`export_plots`.
+
+    :param path: Path of a text file or NumPy archive with sweep data.
+    :param out_path: Path to save the image to. The index of the sweep is appended to
+        the file name if the file holds several sweeps.
+    :param fmt: Image format, "png" or "svg".
+    :returns: List of saved images.
+    """
+
+    from pyqtgraph import exporters
+
+    sweeps = load_sweeps(path, mmap=True)
+    out_paths = []
+
+    for index, sweep_data in enumerate(sweeps, start=1):
+
+        if len(sweeps) > 1:
+            root, ext = osp.splitext(out_path)
+            out_paths.append(f"{root}_{index}{ext}")
+        else:
+            out_paths.append(out_path)
+
+        _canvas.plot(sweep_data)
+        _app.processEvents()  # lay out legend and axes
+
+        if fmt == "svg":
+            exporter = exporters.SVGExporter(_canvas.scene())
+        else:
+            exporter = exporters.ImageExporter(_canvas.scene())
+
+        exporter.export(out_paths[-1])
+
+    return out_paths
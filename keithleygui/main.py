@@ -5,27 +5,60 @@
 # (see LICENSE.txt for details)
 
 # system imports
+import sys
+import time
+import queue
+import logging
+import threading
 import os.path as osp
 import configparser as cp
 
 # external imports
-import pkg_resources as pkgr
 import pyvisa
 from PyQt5 import QtCore, QtWidgets, uic
-from keithley2600 import Keithley2600, FETResultTable
 from keithley2600.keithley_driver import KeithleyIOError
-import numpy as np
 
 # local imports
 from keithleygui.pyqt_labutils import LedIndicator, SettingsWidget, ConnectionDialog
 from keithleygui.pyqtplot_canvas import SweepDataPlot
-from keithleygui.config.main import CONF
+from keithleygui import measurement
+from keithleygui.measurement import SweepJob
+from keithleygui.simulation import SimulatedKeithley2600, create_keithley, is_simulated
+from keithleygui.capabilities import get_profile, load_profile
+from keithleygui.datafile import FORMATS, save_sweep, load_sweeps
+from keithleygui.config.base import get_conf_path
+from keithleygui.config.main import CONF, SUBFOLDER
 
-MAIN_UI_PATH = pkgr.resource_filename("keithleygui", "main.ui")
+MAIN_UI_PATH = osp.join(osp.dirname(osp.abspath(__file__)), "main.ui")
 
+# folder in the config directory for the journals of sweeps which are not auto-saved
+RECOVERY_FOLDER = "recovery"
 
-def _get_smus(keithley):
-    smu_list = [attr_name for attr_name in dir(keithley) if attr_name.startswith("smu")]
+# time in sec until the main window is shown and responsive
+STARTUP_BUDGET = 1.0
+
+logger = logging.getLogger(__name__)
+
+
+def _get_profile(keithley):
+    """
+    Returns the capabilities of a Keithley. Without a connection, the saved profile
+    for its VISA address is returned, if any.
+    """
+    if keithley.connected:
+        try:
+            return get_profile(keithley)
+        except (pyvisa.VisaIOError, pyvisa.InvalidSession, OSError, KeithleyIOError):
+            return None
+
+    return load_profile(keithley.visa_address)
+
+
+def _get_smus(keithley, profile=None):
+    if profile is not None:
+        smu_list = list(profile.smus)
+    else:
+        smu_list = [name for name in dir(keithley) if name.startswith("smu")]
 
     # we need at least two SMUs for GUI
     # -> fill with placeholders if required
@@ -59,18 +92,18 @@ class SMUSettingsWidget(SettingsWidget):
         if self.smu_name != "--":
 
             try:
-                sense_mode = CONF.get(self.smu_name, "sense")
+                settings = CONF.get_section(self.smu_name)
+            except cp.NoSectionError:
+                return
 
-                if sense_mode == "SENSE_LOCAL":
-                    self.sense_type.setCurrentIndex(self.SENSE_LOCAL)
-                elif sense_mode == "SENSE_REMOTE":
-                    self.sense_type.setCurrentIndex(self.SENSE_REMOTE)
+            if settings["sense"] == "SENSE_LOCAL":
+                self.sense_type.setCurrentIndex(self.SENSE_LOCAL)
+            elif settings["sense"] == "SENSE_REMOTE":
+                self.sense_type.setCurrentIndex(self.SENSE_REMOTE)
 
-                self.limit_i.setValue(CONF.get(self.smu_name, "limiti"))
-                self.limit_v.setValue(CONF.get(self.smu_name, "limitv"))
-                self.high_c.setChecked(CONF.get(self.smu_name, "highc"))
-            except cp.NoSectionError:
-                pass
+            self.limit_i.setValue(settings["limiti"])
+            self.limit_v.setValue(settings["limitv"])
+            self.high_c.setChecked(settings["highc"])
 
     def save_defaults(self):
 
@@ -88,11 +121,11 @@ class SMUSettingsWidget(SettingsWidget):
 
 # noinspection PyArgumentList
 class SweepSettingsWidget(SettingsWidget):
-    def __init__(self, keithley):
+    def __init__(self, keithley, smu_list=None):
         super().__init__()
 
         self.keithley = keithley
-        self.smu_list = _get_smus(self.keithley)
+        self.smu_list = smu_list or _get_smus(self.keithley)
 
         self.t_int = self.addDoubleField("Integration time:", 0.1, "s", [0.000016, 0.5])
         self.t_settling = self.addDoubleField(
@@ -109,9 +142,9 @@ class SweepSettingsWidget(SettingsWidget):
         self.smu_gate.currentIndexChanged.connect(self.on_smu_gate_changed)
         self.smu_drain.currentIndexChanged.connect(self.on_smu_drain_changed)
 
-    def update_smu_list(self):
+    def update_smu_list(self, smu_list=None):
 
-        self.smu_list = _get_smus(self.keithley)
+        self.smu_list = smu_list or _get_smus(self.keithley)
 
         self.smu_gate.clear()
         self.smu_drain.clear()
@@ -207,10 +240,10 @@ class OutputSweepSettingsWidget(SettingsWidget):
 
 
 class IVSweepSettingsWidget(SettingsWidget):
-    def __init__(self, keithley):
+    def __init__(self, keithley, smu_list=None):
         super().__init__()
         self.keithley = keithley
-        self.smu_list = _get_smus(self.keithley)
+        self.smu_list = smu_list or _get_smus(self.keithley)
 
         self.v_start = self.addDoubleField("Vd start:", 0, "V")
         self.v_stop = self.addDoubleField("Vd stop:", 0, "V")
@@ -219,8 +252,8 @@ class IVSweepSettingsWidget(SettingsWidget):
 
         self.load_defaults()
 
-    def update_smu_list(self):
-        self.smu_list = _get_smus(self.keithley)
+    def update_smu_list(self, smu_list=None):
+        self.smu_list = smu_list or _get_smus(self.keithley)
         self.smu_sweep.clear()
         self.smu_sweep.addItems(self.smu_list)
         self.smu_sweep.setCurrentIndex(0)
@@ -239,6 +272,252 @@ class IVSweepSettingsWidget(SettingsWidget):
         CONF.set("Sweep", "smu_sweep", self.smu_sweep.currentText())
 
 
+def _sweep_voltages(params):
+    """Returns the magnitudes of all start, stop and step voltages of a sweep."""
+    voltages = []
+
+    for name, value in params.items():
+        if name.startswith("V") and not name.endswith("Step"):
+            values = value if isinstance(value, list) else [value]
+            voltages += [abs(v) for v in values if v != "trailing"]
+
+    return voltages
+
+
+def _describe_sweep(params):
+    """Returns a short, human readable description of a sweep."""
+
+    if params["sweep_type"] == "transfer":
+        desc = (
+            f"Transfer: Vg {params['VgStart']} to {params['VgStop']} V, "
+            f"Vd = {params['VdList']} V"
+        )
+    elif params["sweep_type"] == "output":
+        desc = (
+            f"Output: Vd {params['VdStart']} to {params['VdStop']} V, "
+            f"Vg = {params['VgList']} V"
+        )
+    else:
+        desc = f"IV: {params['VStart']} to {params['VStop']} V ({params['smu_sweep']})"
+
+    pulsed = ", pulsed" if params["pulsed"] else ""
+
+    return f"{desc}, tInt = {params['tInt']} s{pulsed}"
+
+
+# noinspection PyArgumentList
+class SequencerWidget(QtWidgets.QWidget):
+    """
+    Holds an ordered list of sweeps to be run back-to-back. Results are saved to
+    paths created from a filename template instead of asking the user.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent=parent)
+
+        self._sweeps = []
+        self._job_rows = dict()
+
+        self.listWidget = QtWidgets.QListWidget()
+
+        self.pushButtonAdd = QtWidgets.QPushButton("Add current sweep")
+        self.pushButtonRemove = QtWidgets.QPushButton("Remove")
+        self.pushButtonUp = QtWidgets.QPushButton("Up")
+        self.pushButtonDown = QtWidgets.QPushButton("Down")
+        self.pushButtonClear = QtWidgets.QPushButton("Clear")
+        self.pushButtonRun = QtWidgets.QPushButton("Run sequence")
+
+        self.lineEditDirectory = QtWidgets.QLineEdit()
+        self.pushButtonBrowse = QtWidgets.QPushButton("...")
+        self.lineEditTemplate = QtWidgets.QLineEdit()
+        self.lineEditTemplate.setToolTip(
+            "Fields: {index}, {time}, {sweep_type}, {smu_gate}, {smu_drain} "
+            "and all other sweep parameters. Sweeps saved to an existing .npz file "
+            "are appended to it."
+        )
+
+        buttons = QtWidgets.QHBoxLayout()
+        for button in (
+            self.pushButtonAdd,
+            self.pushButtonRemove,
+            self.pushButtonUp,
+            self.pushButtonDown,
+            self.pushButtonClear,
+        ):
+            buttons.addWidget(button)
+
+        directory = QtWidgets.QHBoxLayout()
+        directory.addWidget(self.lineEditDirectory)
+        directory.addWidget(self.pushButtonBrowse)
+
+        form = QtWidgets.QFormLayout()
+        form.addRow("Directory:", directory)
+        form.addRow("File name:", self.lineEditTemplate)
+
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addWidget(self.listWidget)
+        layout.addLayout(buttons)
+        layout.addLayout(form)
+        layout.addWidget(self.pushButtonRun)
+
+        self.pushButtonRemove.clicked.connect(self.on_remove_clicked)
+        self.pushButtonUp.clicked.connect(lambda: self.move_selected(-1))
+        self.pushButtonDown.clicked.connect(lambda: self.move_selected(1))
+        self.pushButtonClear.clicked.connect(self.clear)
+        self.pushButtonBrowse.clicked.connect(self.on_browse_clicked)
+
+        self.load_defaults()
+
+    def sweeps(self):
+        """Returns a list of sweep parameter dictionaries."""
+        return list(self._sweeps)
+
+    def directory(self):
+        return osp.expanduser(self.lineEditDirectory.text())
+
+    def template(self):
+        return self.lineEditTemplate.text()
+
+    def add_sweep(self, params):
+        self._sweeps.append(params)
+        self._update_list()
+
+    def clear(self):
+        self._sweeps.clear()
+        self._update_list()
+
+    def set_job(self, row, job):
+        """Associates a queued job with a row to show its state."""
+        self._job_rows[job.id] = row
+        self.update_job(job)
+
+    def update_job(self, job):
+        row = self._job_rows.get(job.id)
+
+        if row is None or row >= len(self._sweeps):
+            return
+
+        item = self.listWidget.item(row)
+        item.setText(f"{row + 1}: {_describe_sweep(self._sweeps[row])} [{job.state}]")
+
+    def move_selected(self, offset):
+        row = self.listWidget.currentRow()
+        new_row = row + offset
+
+        if row < 0 or not 0 <= new_row < len(self._sweeps):
+            return
+
+        self._sweeps.insert(new_row, self._sweeps.pop(row))
+        self._update_list()
+        self.listWidget.setCurrentRow(new_row)
+
+    @QtCore.pyqtSlot()
+    def on_remove_clicked(self):
+        row = self.listWidget.currentRow()
+
+        if row >= 0:
+            self._sweeps.pop(row)
+            self._update_list()
+
+    @QtCore.pyqtSlot()
+    def on_browse_clicked(self):
+        prompt = "Select a directory for sweep data."
+        path = QtWidgets.QFileDialog.getExistingDirectory(
+            self, prompt, self.directory()
+        )
+        if path:
+            self.lineEditDirectory.setText(path)
+
+    def _update_list(self):
+        self._job_rows.clear()
+        self.listWidget.clear()
+
+        for row, params in enumerate(self._sweeps):
+            self.listWidget.addItem(f"{row + 1}: {_describe_sweep(params)}")
+
+    def load_defaults(self):
+        self.lineEditDirectory.setText(CONF.get("Sequencer", "directory"))
+        self.lineEditTemplate.setText(CONF.get("Sequencer", "template"))
+
+    def save_defaults(self):
+        with CONF.batch():
+            CONF.set("Sequencer", "directory", self.lineEditDirectory.text())
+            CONF.set("Sequencer", "template", self.lineEditTemplate.text())
+
+
+# noinspection PyArgumentList
+class AutoSaveDialog(QtWidgets.QDialog):
+    """
+    Settings for saving every sweep automatically to a path created from a filename
+    template instead of asking the user where to save it.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent=parent)
+        self.setWindowTitle("Auto-save")
+
+        self.checkBoxEnabled = QtWidgets.QCheckBox("Save every sweep automatically")
+        self.lineEditDirectory = QtWidgets.QLineEdit()
+        self.pushButtonBrowse = QtWidgets.QPushButton("...")
+        self.lineEditTemplate = QtWidgets.QLineEdit()
+        self.lineEditTemplate.setToolTip(
+            "Fields: {time}, {sweep_type}, {smu_gate}, {smu_drain} and all other "
+            "sweep parameters. Sweeps saved to an existing .npz file are appended "
+            "to it."
+        )
+
+        directory = QtWidgets.QHBoxLayout()
+        directory.addWidget(self.lineEditDirectory)
+        directory.addWidget(self.pushButtonBrowse)
+
+        form = QtWidgets.QFormLayout()
+        form.addRow(self.checkBoxEnabled)
+        form.addRow("Directory:", directory)
+        form.addRow("File name:", self.lineEditTemplate)
+
+        buttons = QtWidgets.QDialogButtonBox(
+            QtWidgets.QDialogButtonBox.Ok | QtWidgets.QDialogButtonBox.Cancel
+        )
+
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addLayout(form)
+        layout.addWidget(buttons)
+
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        self.pushButtonBrowse.clicked.connect(self.on_browse_clicked)
+        self.accepted.connect(self.save_defaults)
+        self.rejected.connect(self.load_defaults)
+
+        self.load_defaults()
+
+    def save_template(self):
+        """Returns the path template for saving sweeps or ``None`` if disabled."""
+        if self.checkBoxEnabled.isChecked():
+            directory = osp.expanduser(self.lineEditDirectory.text())
+            return osp.join(directory, self.lineEditTemplate.text())
+
+    @QtCore.pyqtSlot()
+    def on_browse_clicked(self):
+        prompt = "Select a directory for sweep data."
+        path = QtWidgets.QFileDialog.getExistingDirectory(
+            self, prompt, osp.expanduser(self.lineEditDirectory.text())
+        )
+        if path:
+            self.lineEditDirectory.setText(path)
+
+    def load_defaults(self):
+        self.checkBoxEnabled.setChecked(CONF.get("AutoSave", "enabled"))
+        self.lineEditDirectory.setText(CONF.get("AutoSave", "directory"))
+        self.lineEditTemplate.setText(CONF.get("AutoSave", "template"))
+
+    def save_defaults(self):
+        with CONF.batch():
+            CONF.set("AutoSave", "enabled", self.checkBoxEnabled.isChecked())
+            CONF.set("AutoSave", "directory", self.lineEditDirectory.text())
+            CONF.set("AutoSave", "template", self.lineEditTemplate.text())
+
+
 # noinspection PyArgumentList
 class KeithleyGuiApp(QtWidgets.QMainWindow):
     """ Provides a GUI for transfer and output sweeps on the Keithley 2600."""
@@ -247,24 +526,52 @@ class KeithleyGuiApp(QtWidgets.QMainWindow):
 
     def __init__(self, keithley=None):
         super().__init__()
+
+        # time spent setting up parts of the window, see `--profile-startup`
+        self.startup_timer = measurement.PhaseTimer()
+
         # load user interface layout from .ui file
-        uic.loadUi(MAIN_UI_PATH, self)
+        with self.startup_timer.phase("ui"):
+            uic.loadUi(MAIN_UI_PATH, self)
+
+        # without a Keithley instance, connect in the background once the GUI is set up
+        self.keithley = keithley
+        self.connectThread = None
 
-        if keithley:
-            self.keithley = keithley
+        # use saved capabilities to set up the GUI before connecting
+        if keithley is None:
+            self.profile = load_profile(CONF.get("Connection", "VISA_ADDRESS"))
         else:
-            address = CONF.get("Connection", "VISA_ADDRESS")
-            lib = CONF.get("Connection", "VISA_LIBRARY")
-            self.keithley = Keithley2600(address, lib)
+            self.profile = _get_profile(keithley)
 
-        self.smu_list = _get_smus(self.keithley)
+        self.smu_list = _get_smus(self.keithley, self.profile)
         self.sweep_data = None
+        self.sweep_job = None  # job which recorded sweep_data, if any
+
+        # start measurement worker, it runs queued sweep jobs one after another
+        self.measureThread = MeasureThread(self.keithley)
+        self.measureThread.started_sig.connect(self.on_measure_started)
+        self.measureThread.progress_sig.connect(self.on_measure_progress)
+        self.measureThread.finished_sig.connect(self.on_measure_done)
+        self.measureThread.error_sig.connect(self.on_measure_error)
+        self.measureThread.queue_sig.connect(self.on_queue_changed)
+        self.measureThread.state_sig.connect(self.on_job_state_changed)
+        self.measureThread.start()
+
+        # save sweep data in the background, also while the next sweep is running
+        self.saveThread = SaveThread()
+        self.saveThread.saved_sig.connect(self.on_save_done)
+        self.saveThread.error_sig.connect(self.on_save_error)
+        self.saveThread.start()
 
         # create sweep settings panes
-        self.transfer_sweep_settings = TransferSweepSettingsWidget()
-        self.output_sweep_settings = OutputSweepSettingsWidget()
-        self.iv_sweep_settings = IVSweepSettingsWidget(self.keithley)
-        self.general_sweep_settings = SweepSettingsWidget(self.keithley)
+        with self.startup_timer.phase("settings"):
+            self.transfer_sweep_settings = TransferSweepSettingsWidget()
+            self.output_sweep_settings = OutputSweepSettingsWidget()
+            self.iv_sweep_settings = IVSweepSettingsWidget(self.keithley, self.smu_list)
+            self.general_sweep_settings = SweepSettingsWidget(
+                self.keithley, self.smu_list
+            )
 
         self.tabWidgetSweeps.widget(0).layout().addWidget(self.transfer_sweep_settings)
         self.tabWidgetSweeps.widget(1).layout().addWidget(self.output_sweep_settings)
@@ -273,22 +580,43 @@ class KeithleyGuiApp(QtWidgets.QMainWindow):
 
         # create tabs for smu settings
         self.smu_tabs = []
-        for smu_name in self.smu_list:
-            tab = SMUSettingsWidget(smu_name)
-            self.tabWidgetSettings.addTab(tab, smu_name)
-            self.smu_tabs.append(tab)
+        with self.startup_timer.phase("settings"):
+            for smu_name in self.smu_list:
+                tab = SMUSettingsWidget(smu_name)
+                self.tabWidgetSettings.addTab(tab, smu_name)
+                self.smu_tabs.append(tab)
+
+        # create sequencer dock
+        with self.startup_timer.phase("settings"):
+            self.sequencer = SequencerWidget()
+        self.sequencerDock = QtWidgets.QDockWidget("Sequencer", self)
+        self.sequencerDock.setObjectName("sequencerDock")
+        self.sequencerDock.setWidget(self.sequencer)
+        self.addDockWidget(QtCore.Qt.RightDockWidgetArea, self.sequencerDock)
+        self.sequencerDock.hide()
+        self.menuWindow.addSeparator()
+        self.menuWindow.addAction(self.sequencerDock.toggleViewAction())
+
+        # create auto-save settings
+        self.autoSaveDialog = AutoSaveDialog(self)
+        self.actionAutoSave = self.menu_File.addAction("Auto-save...")
 
         # create plot widget
-        self.canvas = SweepDataPlot()
+        with self.startup_timer.phase("canvas"):
+            self.canvas = SweepDataPlot()
         self.gridLayout2.addWidget(self.canvas)
 
-        # create LED indicator
+        # create LED indicator and button to cancel connection attempts
+        self.pushButtonCancelConnect = QtWidgets.QPushButton("Cancel")
+        self.pushButtonCancelConnect.hide()
+        self.statusBar.addPermanentWidget(self.pushButtonCancelConnect)
         self.led = LedIndicator(self)
         self.statusBar.addPermanentWidget(self.led)
         self.led.setChecked(False)
 
-        # create connection dialog
-        self.connectionDialog = ConnectionDialog(self, self.keithley, CONF)
+        # create connection dialog, also without a Keithley instance so that the
+        # connection settings can be fixed if creating one fails
+        self.create_connection_dialog()
 
         # restore last position and size
         self.restore_geometry()
@@ -296,17 +624,28 @@ class KeithleyGuiApp(QtWidgets.QMainWindow):
         # update GUI status and connect callbacks
         self.actionSaveSweepData.setEnabled(False)
         self.connect_ui_callbacks()
-        self.on_load_default()
+        with self.startup_timer.phase("defaults"):
+            self.on_load_default()
         self.update_gui_connection()
 
-        # connection update timer: check periodically if keithley is connected
-        self.connection_status_update = QtCore.QTimer()
-        self.connection_status_update.timeout.connect(self.update_gui_connection)
-        self.connection_status_update.start(10000)  # 10 sec
+        # check periodically in the background if keithley is still connected
+        self.connectionMonitor = ConnectionMonitor(
+            self.keithley, lambda: self.measureThread.busy
+        )
+        self.connectionMonitor.state_sig.connect(self.on_connection_state_changed)
+        self.connectionMonitor.start()
+
+        if self.keithley is None:
+            self.connect_async(new_instance=True, interactive=False)
 
     def update_smu_list(self):
 
-        self.smu_list = _get_smus(self.keithley)
+        smu_list = _get_smus(self.keithley, self.profile)
+
+        if smu_list == self.smu_list:
+            return  # keep tabs and any unsaved settings
+
+        self.smu_list = smu_list
 
         # recreate tabs for smu settings
         self.smu_tabs = []
@@ -316,8 +655,8 @@ class KeithleyGuiApp(QtWidgets.QMainWindow):
             self.tabWidgetSettings.addTab(tab, smu_name)
             self.smu_tabs.append(tab)
 
-        self.iv_sweep_settings.update_smu_list()
-        self.general_sweep_settings.update_smu_list()
+        self.iv_sweep_settings.update_smu_list(smu_list)
+        self.general_sweep_settings.update_smu_list(smu_list)
 
     @staticmethod
     def _string_to_vd(string):
@@ -349,17 +688,18 @@ class KeithleyGuiApp(QtWidgets.QMainWindow):
 
     def save_geometry(self):
         geo = self.geometry()
-        CONF.set("Window", "height", geo.height())
-        CONF.set("Window", "width", geo.width())
-        CONF.set("Window", "x", geo.x())
-        CONF.set("Window", "y", geo.y())
+        with CONF.batch():
+            CONF.set("Window", "height", geo.height())
+            CONF.set("Window", "width", geo.width())
+            CONF.set("Window", "x", geo.x())
+            CONF.set("Window", "y", geo.y())
 
     def connect_ui_callbacks(self):
         """Connect buttons and menus to callbacks."""
         self.pushButtonRun.clicked.connect(self.on_sweep_clicked)
         self.pushButtonAbort.clicked.connect(self.on_abort_clicked)
 
-        self.actionSettings.triggered.connect(self.connectionDialog.open)
+        self.actionSettings.triggered.connect(self.on_settings_clicked)
         self.actionConnect.triggered.connect(self.on_connect_clicked)
         self.actionDisconnect.triggered.connect(self.on_disconnect_clicked)
         self.action_Exit.triggered.connect(self.exit_)
@@ -367,51 +707,82 @@ class KeithleyGuiApp(QtWidgets.QMainWindow):
         self.actionLoad_data_from_file.triggered.connect(self.on_load_clicked)
         self.actionSaveDefaults.triggered.connect(self.on_save_default)
         self.actionLoadDefaults.triggered.connect(self.on_load_default)
+        self.actionAutoSave.triggered.connect(self.autoSaveDialog.show)
+
+        self.sequencer.pushButtonAdd.clicked.connect(self.on_add_to_sequence_clicked)
+        self.sequencer.pushButtonRun.clicked.connect(self.on_run_sequence_clicked)
+        self.pushButtonCancelConnect.clicked.connect(self.on_cancel_connect_clicked)
 
     # =============================================================================
     # Measurement callbacks
     # =============================================================================
 
-    def apply_smu_settings(self):
+    def get_smu_settings(self):
         """
-        Applies SMU settings to Keithley before a measurement.
-        Warning: self.keithley.reset() will reset those settings.
+        Returns the SMU settings from the GUI as a dictionary with SMU names as keys.
+        The settings are applied by :class:`MeasureThread` before each sweep.
         """
-        for tab in self.smu_tabs:
+        smu_settings = dict()
 
-            smu = getattr(self.keithley, tab.smu_name)
+        for tab in self.smu_tabs:
 
             if tab.sense_type.currentIndex() == tab.SENSE_LOCAL:
-                smu.sense = smu.SENSE_LOCAL
-            elif tab.sense_type.currentIndex() == tab.SENSE_REMOTE:
-                smu.sense = smu.SENSE_REMOTE
-
-            lim_i = tab.limit_i.value()
-            smu.source.limiti = lim_i
-            smu.trigger.source.limiti = lim_i
+                sense = "SENSE_LOCAL"
+            else:
+                sense = "SENSE_REMOTE"
 
-            lim_v = tab.limit_v.value()
-            smu.source.limitv = lim_v
-            smu.trigger.source.limitv = lim_v
+            smu_settings[tab.smu_name] = {
+                "sense": sense,
+                "limiti": tab.limit_i.value(),
+                "limitv": tab.limit_v.value(),
+                "highc": tab.high_c.isChecked(),
+            }
 
-            smu.source.highc = int(tab.high_c.isChecked())
+        return smu_settings
 
     @QtCore.pyqtSlot()
     def on_sweep_clicked(self):
         """ Start a transfer measurement with current settings."""
 
-        if self.keithley.busy:
+        if self.keithley.busy and not self.measureThread.busy:
             msg = "Keithley is currently busy. Please try again later."
             QtWidgets.QMessageBox.information(self, "Keithley Busy", msg)
 
             return
 
-        self.apply_smu_settings()
+        t0 = time.perf_counter()
+        params = self.get_sweep_params()
+        smu_settings = self.get_smu_settings()
+        t_validation = time.perf_counter() - t0
+
+        if params is None:
+            return
+
+        # fail before running the sweep instead of when saving its data
+        save_template = self.autoSaveDialog.save_template()
+
+        if save_template is not None:
+            try:
+                measurement.check_save_template(save_template, [params])
+            except ValueError as exc:
+                QtWidgets.QMessageBox.information(self, "Template Error", str(exc))
+                return
+
+        # queue sweep job, it will run as soon as previous jobs are done
+        job = self.measureThread.submit(params, smu_settings, save_template)
+        job.timer.add("validation", t_validation)
+        self._gui_state_busy()
+
+    def get_sweep_params(self):
+        """
+        Returns the sweep parameters for the currently selected sweep type as a
+        dictionary. SMUs are given by name. Returns ``None`` if the parameters are
+        invalid.
+        """
 
         params = dict()
 
         if self.tabWidgetSweeps.currentIndex() == 0:
-            self.statusBar.showMessage("    Recording transfer curve.")
             # get sweep settings
             params["sweep_type"] = "transfer"
             params["VgStart"] = self.transfer_sweep_settings.vg_start.value()
@@ -420,7 +791,6 @@ class KeithleyGuiApp(QtWidgets.QMainWindow):
             params["VdList"] = self.transfer_sweep_settings.vd_list.value()
 
         elif self.tabWidgetSweeps.currentIndex() == 1:
-            self.statusBar.showMessage("    Recording output curve.")
             # get sweep settings
             params["sweep_type"] = "output"
             params["VdStart"] = self.output_sweep_settings.vd_start.value()
@@ -429,70 +799,169 @@ class KeithleyGuiApp(QtWidgets.QMainWindow):
             params["VgList"] = self.output_sweep_settings.vg_list.value()
 
         elif self.tabWidgetSweeps.currentIndex() == 2:
-            self.statusBar.showMessage("    Recording IV curve.")
             # get sweep settings
             params["sweep_type"] = "iv"
             params["VStart"] = self.iv_sweep_settings.v_start.value()
             params["VStop"] = self.iv_sweep_settings.v_stop.value()
             params["VStep"] = self.iv_sweep_settings.v_step.value()
-            smusweep = self.iv_sweep_settings.smu_sweep.currentText()
-            params["smu_sweep"] = getattr(self.keithley, smusweep)
+            params["smu_sweep"] = self.iv_sweep_settings.smu_sweep.currentText()
 
         else:
-            return
+            return None
 
         # get general sweep settings
-        smu_gate = self.general_sweep_settings.smu_gate.currentText()
-        smu_drain = self.general_sweep_settings.smu_drain.currentText()
         params["tInt"] = self.general_sweep_settings.t_int.value()
         params["delay"] = self.general_sweep_settings.t_settling.value()
-        params["smu_gate"] = getattr(self.keithley, smu_gate)
-        params["smu_drain"] = getattr(self.keithley, smu_drain)
+        params["smu_gate"] = self.general_sweep_settings.smu_gate.currentText()
+        params["smu_drain"] = self.general_sweep_settings.smu_drain.currentText()
         params["pulsed"] = bool(self.general_sweep_settings.sweep_type.currentIndex())
 
         # check if integration time is valid, return otherwise
-        freq = self.keithley.localnode.linefreq
+        # without a known line frequency, the driver checks this before the sweep
+        if self.profile is not None:
+            freq = self.profile.linefreq
+
+            if not 0.001 / freq < params["tInt"] < 25.0 / freq:
+                msg = (
+                    "Integration time must be between 0.001 and 25 "
+                    + "power line cycles of 1/(%s Hz)." % freq
+                )
+                QtWidgets.QMessageBox.information(self, "Parameter Error", msg)
 
-        if not 0.001 / freq < params["tInt"] < 25.0 / freq:
-            msg = (
-                "Integration time must be between 0.001 and 25 "
-                + "power line cycles of 1/(%s Hz)." % freq
-            )
-            QtWidgets.QMessageBox.information(self, "Parameter Error", msg)
+                return None
+
+            # check if voltages are within the source ranges of the Keithley
+            v_max = self.profile.max_voltage
+
+            if v_max is not None and max(_sweep_voltages(params)) > v_max:
+                msg = (
+                    f"Voltages must be between -{v_max} and {v_max} V "
+                    f"for the Keithley {self.profile.model}."
+                )
+                QtWidgets.QMessageBox.information(self, "Parameter Error", msg)
+
+                return None
+
+        return params
+
+    @QtCore.pyqtSlot()
+    def on_add_to_sequence_clicked(self):
+        """Add a sweep with the current settings to the sequence."""
+        params = self.get_sweep_params()
+
+        if params is not None:
+            self.sequencer.add_sweep(params)
+
+    @QtCore.pyqtSlot()
+    def on_run_sequence_clicked(self):
+        """Queue all sweeps of the sequence, each result is saved automatically."""
+
+        if self.keithley.busy and not self.measureThread.busy:
+            msg = "Keithley is currently busy. Please try again later."
+            QtWidgets.QMessageBox.information(self, "Keithley Busy", msg)
 
             return
 
-        # create measurement thread with params dictionary
-        self.measureThread = MeasureThread(self.keithley, params)
-        self.measureThread.finished_sig.connect(self.on_measure_done)
-        self.measureThread.error_sig.connect(self.on_measure_error)
+        template = osp.join(self.sequencer.directory(), self.sequencer.template())
+        sweeps = self.sequencer.sweeps()
+
+        # fail before running any sweep instead of when saving its data
+        try:
+            measurement.check_save_template(template, sweeps)
+        except ValueError as exc:
+            QtWidgets.QMessageBox.information(self, "Template Error", str(exc))
+            return
+
+        self.sequencer.save_defaults()
+        smu_settings = self.get_smu_settings()
+
+        for index, params in enumerate(sweeps, start=1):
+            job = self.measureThread.submit(
+                params, smu_settings, save_template=template, index=index
+            )
+            self.sequencer.set_job(index - 1, job)
 
-        # run measurement
         self._gui_state_busy()
-        self.measureThread.start()
 
-    def on_measure_done(self, sd):
-        self.statusBar.showMessage("    Ready.")
-        self._gui_state_idle()
+    def on_measure_started(self, job):
+        self.canvas.clear()
+        self._gui_state_busy()
+
+    def on_measure_progress(self, job, sd):
+        with job.timer.phase("plot"):
+            if self.canvas.lines:
+                self.canvas.update_plot(sd)
+            else:
+                self.canvas.plot(sd)
+
+    def on_measure_done(self, job):
+        self._gui_state_after_job()
         self.actionSaveSweepData.setEnabled(True)
 
-        self.sweep_data = sd
-        self.canvas.plot(self.sweep_data)
-        if not self.keithley.abort_event.is_set():
-            self.on_save_clicked()
-
-    def on_measure_error(self, exc):
-        self.statusBar.showMessage("    Ready.")
-        self._gui_state_idle()
-        QtWidgets.QMessageBox.information(
-            self, "Sweep Error", f"{exc.__class__.__name__}: {exc.args[0]}"
-        )
+        self.sweep_data = job.sweep_data
+        self.sweep_job = job
+
+        with job.timer.phase("plot"):
+            self.canvas.plot(self.sweep_data)
+
+        job.attach_timings()
+        logger.info("%s: plotted in %.3g s", job, job.timer.durations["plot"])
+
+        timing = f"Sweep took {job.timer.total:.1f} s ({job.timer})."
+
+        if job.state != SweepJob.DONE:
+            self.statusBar.showMessage(f"    {timing}", 10000)
+        elif job.save_template:
+            self.statusBar.showMessage(f"    Saving... {timing}")
+            self.saveThread.submit(job)
+        else:
+            self.statusBar.showMessage(f"    {timing}", 10000)
+            # save the data of this job, another queued sweep may finish and replace
+            # self.sweep_data while the modal dialog is open
+            self.save_sweep_dialog(job.sweep_data, job)
+
+    def on_save_done(self, job):
+        t_save = job.timer.durations["save"]
+        timing = f"Sweep took {job.timer.total:.1f} s ({job.timer})."
+        msg = f"    Saved to {job.save_path} in {t_save:.2g} s. {timing}"
+        self.statusBar.showMessage(msg, 10000)
+
+    def on_save_error(self, job):
+        """Report failed saves without blocking unattended sweeps with a dialog."""
+        self.sequencer.update_job(job)
+
+        exc = job.error
+        msg = f"    Could not save sweep: {exc.__class__.__name__}: {exc}"
+
+        if job.journal_path is not None:
+            msg += f" Data kept in {job.journal_path}."
+
+        self.statusBar.showMessage(msg)
+
+    def on_measure_error(self, job):
+        self._gui_state_after_job()
+
+        if job.sweep_data is not None:
+            # the sweep succeeded but a later step failed, show the data anyway
+            self.sweep_data = job.sweep_data
+            self.sweep_job = job
+            self.canvas.plot(self.sweep_data)
+            self.actionSaveSweepData.setEnabled(True)
+
+        exc = job.error
+        msg = f"{exc.__class__.__name__}: {exc.args[0]}"
+
+        if job.journal_path is not None:
+            msg += f"\n\nThe data recorded so far has been kept in {job.journal_path}."
+
+        QtWidgets.QMessageBox.information(self, "Sweep Error", msg)
 
     @QtCore.pyqtSlot()
     def on_abort_clicked(self):
         """
-        Aborts current measurement.
+        Aborts current measurement and cancels all queued sweeps.
         """
+        self.measureThread.cancel_pending()
         self.keithley.abort_event.set()
         for smu in self.smu_list:
             getattr(self.keithley, smu).abort()
@@ -504,15 +973,71 @@ class KeithleyGuiApp(QtWidgets.QMainWindow):
 
     @QtCore.pyqtSlot()
     def on_connect_clicked(self):
-        self.keithley.connect()
-        self.update_smu_list()
+        self.connect_async()
+
+    def connect_async(self, new_instance=False, interactive=True):
+        """
+        Connects to Keithley in the background. The GUI remains responsive and shows a
+        button to cancel the attempt.
+
+        :param new_instance: Create a new Keithley instance from the connection
+            settings instead of reconnecting the current one.
+        :param interactive: Show a message if the connection attempt fails.
+        """
+
+        self.connectThread = ConnectThread(
+            CONF.get("Connection", "VISA_ADDRESS"),
+            CONF.get("Connection", "VISA_LIBRARY"),
+            None if new_instance else self.keithley,
+            parent=self,
+        )
+        self.connectThread.interactive = interactive
+        self.connectThread.result_sig.connect(self.on_connect_finished)
+        self.connectThread.finished.connect(self.connectThread.deleteLater)
+        self.connectThread.start()
+
         self.update_gui_connection()
-        if not self.keithley.connected:
+
+    @QtCore.pyqtSlot()
+    def on_cancel_connect_clicked(self):
+        """
+        Returns to the disconnected state without waiting for the connection attempt.
+        The attempt itself cannot be interrupted and is discarded once it returns.
+        """
+        if self.connectThread is not None:
+            self.connectThread.cancelled = True
+            self.update_gui_connection()
+
+    def on_connect_finished(self, keithley, error):
+        thread = self.connectThread
+        self.connectThread = None
+        self.profile = thread.profile
+
+        if keithley is not None and thread.cancelled:
+            keithley.disconnect()
+
+        if keithley is not None and keithley is not self.keithley:
+            self.set_keithley(keithley)
+        else:
+            self.update_smu_list()
+            self.update_gui_connection()
+            self.connectionMonitor.check_now()
+
+        if error is not None:
+            msg = f"Cannot connect to Keithley: {error}"
+        elif not thread.cancelled and not keithley.connected:
             msg = (
-                f"Keithley cannot be reached at {self.keithley.visa_address}. "
+                f"Keithley cannot be reached at {keithley.visa_address}. "
                 f"Please check if address is correct and Keithley is turned on."
             )
+        else:
+            return
+
+        if thread.interactive:
             QtWidgets.QMessageBox.information(self, "Connection Error", msg)
+        else:
+            # don't block connecting in the background with a dialog
+            self.statusBar.showMessage(f"    {msg}")
 
     @QtCore.pyqtSlot()
     def on_disconnect_clicked(self):
@@ -520,18 +1045,120 @@ class KeithleyGuiApp(QtWidgets.QMainWindow):
         self.update_gui_connection()
         self.statusBar.showMessage("    No Keithley connected.")
 
+    @QtCore.pyqtSlot()
+    def on_connection_settings_changed(self):
+        """Switches between a real and a simulated Keithley if required."""
+        lib = CONF.get("Connection", "VISA_LIBRARY")
+        simulated = isinstance(self.keithley, SimulatedKeithley2600)
+
+        if self.keithley is None:
+            # creating an instance failed, try again with the new settings
+            self.connect_async(new_instance=True)
+            return
+
+        if is_simulated(lib) == simulated:
+            return
+
+        if self.measureThread.busy:
+            msg = "Please wait until the current measurement has completed."
+            QtWidgets.QMessageBox.information(self, "Keithley Busy", msg)
+            return
+
+        # create the new instance in the background, it connects on creation
+        self.keithley.disconnect()
+        self.connect_async(new_instance=True)
+
+    @QtCore.pyqtSlot()
+    def on_settings_clicked(self):
+        self.connectionDialog.open()
+
+    def create_connection_dialog(self):
+        """
+        Creates the dialog for the connection settings of the current Keithley
+        instance or, if there is none, of the address and library in the config.
+        """
+        if self.keithley is not None:
+            instr = self.keithley
+        else:
+            instr = _UnconnectedKeithley(
+                CONF.get("Connection", "VISA_ADDRESS"),
+                CONF.get("Connection", "VISA_LIBRARY"),
+            )
+
+        self.connectionDialog = ConnectionDialog(self, instr, CONF)
+        self.connectionDialog.accepted.connect(self.on_connection_settings_changed)
+
+    def set_keithley(self, keithley):
+        """Replaces the Keithley instance used by the GUI and the measurement worker."""
+
+        if self.keithley is not None:
+            self.keithley.disconnect()
+
+        self.keithley = keithley
+
+        self.measureThread.keithley = keithley
+        self.connectionMonitor.keithley = keithley
+        self.iv_sweep_settings.keithley = keithley
+        self.general_sweep_settings.keithley = keithley
+
+        self.create_connection_dialog()
+
+        self.update_smu_list()
+        self.update_gui_connection()
+        self.connectionMonitor.check_now()
+
     @QtCore.pyqtSlot()
     def on_save_clicked(self):
-        """Show GUI to save current sweep data as text file."""
-        prompt = "Save as .txt file."
+        """Show GUI to save current sweep data as text file or NumPy archive."""
+        self.save_sweep_dialog(self.sweep_data, self.sweep_job)
+
+    def save_sweep_dialog(self, sweep_data, job=None):
+        """
+        Show GUI to save sweep data as text file or NumPy archive.
+
+        :param sweep_data: Sweep data to save.
+        :param job: Job which recorded the data. Its journal is removed once the data
+            has been saved and kept otherwise.
+        """
+        prompt = "Save sweep data."
         filename = "untitled.txt"
-        formats = "Text file (*.txt)"
-        filepath, _ = QtWidgets.QFileDialog.getSaveFileName(
-            self, prompt, filename, formats
+        filters = [f"{name} (*{ext})" for ext, name in FORMATS.items()]
+        filepath, selected = QtWidgets.QFileDialog.getSaveFileName(
+            self, prompt, filename, ";;".join(filters)
         )
         if len(filepath) < 4:
+            self._report_journal("Sweep data not saved.", job)
+            return
+
+        # add the extension of the selected format if none is given, some dialogs
+        # don't report the selected filter
+        if not osp.splitext(filepath)[1]:
+            if selected in filters:
+                filepath += list(FORMATS)[filters.index(selected)]
+            else:
+                filepath += list(FORMATS)[0]
+
+        t0 = time.perf_counter()
+
+        try:
+            save_sweep(sweep_data, filepath)
+        except Exception as exc:
+            msg = f"Could not save sweep: {exc.__class__.__name__}: {exc}"
+            QtWidgets.QMessageBox.information(self, "Save Error", msg)
+            self._report_journal("Sweep data not saved.", job)
             return
-        self.sweep_data.save(filepath)
+
+        logger.info("Saved to %s in %.3g s", filepath, time.perf_counter() - t0)
+
+        # the recorded data is safe now
+        if job is not None:
+            measurement.remove_journal(job)
+
+    def _report_journal(self, msg, job):
+        """Shows where the data of a job is kept until it is saved."""
+        if job is not None and job.journal_path is not None:
+            msg += f" Data kept in {job.journal_path}."
+            self.statusBar.showMessage(f"    {msg}")
 
     @QtCore.pyqtSlot()
     def on_load_clicked(self):
@@ -541,8 +1168,29 @@ class KeithleyGuiApp(QtWidgets.QMainWindow):
         if not osp.isfile(filepath):
             return
 
-        self.sweep_data = FETResultTable()
-        self.sweep_data.load(filepath)
+        sweeps = load_sweeps(filepath, mmap=True)
+
+        if len(sweeps) == 0:
+            return
+        elif len(sweeps) > 1:
+            # let the user choose a sweep from an archive
+            items = []
+            for i, sweep in enumerate(sweeps, start=1):
+                item = f"{i}: {sweep.params.get('sweep_type', 'sweep')}"
+                if "time_str" in sweep.params:
+                    item += f", {sweep.params['time_str']}"
+                items.append(item)
+
+            item, ok = QtWidgets.QInputDialog.getItem(
+                self, "Load sweep", "Sweep:", items, len(items) - 1, False
+            )
+            if not ok:
+                return
+            self.sweep_data = sweeps[items.index(item)]
+        else:
+            self.sweep_data = sweeps[0]
+
+        self.sweep_job = None
 
         self.canvas.plot(self.sweep_data)
         self.actionSaveSweepData.setEnabled(True)
@@ -551,15 +1199,17 @@ class KeithleyGuiApp(QtWidgets.QMainWindow):
     def on_save_default(self):
         """Saves current settings from GUI as defaults."""
 
-        # save sweep settings
-        self.transfer_sweep_settings.save_defaults()
-        self.output_sweep_settings.save_defaults()
-        self.iv_sweep_settings.save_defaults()
-        self.general_sweep_settings.save_defaults()
+        # write the config file once for all settings
+        with CONF.batch():
+            # save sweep settings
+            self.transfer_sweep_settings.save_defaults()
+            self.output_sweep_settings.save_defaults()
+            self.iv_sweep_settings.save_defaults()
+            self.general_sweep_settings.save_defaults()
 
-        # save smu specific settings
-        for tab in self.smu_tabs:
-            tab.save_defaults()
+            # save smu specific settings
+            for tab in self.smu_tabs:
+                tab.save_defaults()
 
     @QtCore.pyqtSlot()
     def on_load_default(self):
@@ -577,8 +1227,18 @@ class KeithleyGuiApp(QtWidgets.QMainWindow):
 
     @QtCore.pyqtSlot()
     def exit_(self):
-        self.keithley.disconnect()
-        self.connection_status_update.stop()
+        if self.measureThread.busy:
+            self.on_abort_clicked()
+        self.measureThread.stop()
+        self.saveThread.stop()
+        self.connectionMonitor.stop()
+
+        if self.connectThread is not None:
+            self.connectThread.cancelled = True
+            self.connectThread.wait()
+
+        if self.keithley is not None:
+            self.keithley.disconnect()
         self.save_geometry()
         self.deleteLater()
 
@@ -587,38 +1247,64 @@ class KeithleyGuiApp(QtWidgets.QMainWindow):
     # =============================================================================
 
     def update_gui_connection(self):
-        """Check if Keithley is connected and update GUI."""
-        if self.keithley.connected:
+        """
+        Update GUI to the connection state of Keithley. This does not communicate with
+        Keithley, connection problems are detected by :class:`ConnectionMonitor`.
+        """
+        if self.connectThread is not None and not self.connectThread.cancelled:
+            self._gui_state_connecting()
+        elif self.keithley is None or not self.keithley.connected:
+            self._gui_state_disconnected()
+        elif self.keithley.busy or self.measureThread.busy:
+            self._gui_state_busy()
+        else:
+            self._gui_state_idle()
 
-            try:
-                test = self.keithley.localnode.model
-            except (
-                pyvisa.VisaIOError,
-                pyvisa.InvalidSession,
-                OSError,
-                KeithleyIOError,
-            ):
-                self.keithley.disconnect()
-                self._gui_state_disconnected()
-            else:
+    def on_connection_state_changed(self, connected):
+        """Update GUI when the connection monitor reports a change."""
+        self.update_gui_connection()
+
+    def on_job_state_changed(self, job):
+        """Show the state of sequenced sweeps in the sequencer."""
+        self.sequencer.update_job(job)
+
+    def on_queue_changed(self, n_queued):
+        """Show the number of queued sweeps in the status bar."""
+        if self.measureThread.busy:
+            self._gui_state_busy()
 
-                if self.keithley.busy:
-                    self._gui_state_busy()
-                else:
-                    self._gui_state_idle()
+    def _gui_state_after_job(self):
+        """Set GUI state after a sweep job has finished."""
+        if self.measureThread.busy:
+            self._gui_state_busy()
         else:
-            self._gui_state_disconnected()
+            self._gui_state_idle()
 
     def _gui_state_busy(self):
         """Set GUI to state for running measurement."""
 
-        self.pushButtonRun.setEnabled(False)
+        # further sweeps can be queued while measuring
+        self.pushButtonRun.setEnabled(True)
         self.pushButtonAbort.setEnabled(True)
+        self.sequencer.pushButtonRun.setEnabled(True)
 
         self.actionConnect.setEnabled(False)
         self.actionDisconnect.setEnabled(False)
+        self.actionSettings.setEnabled(True)
+        self.pushButtonCancelConnect.hide()
+
+        job = self.measureThread.current_job
+        n_queued = self.measureThread.queue_depth
+
+        if job is not None:
+            msg = f"    Recording {job.params['sweep_type']} curve."
+        else:
+            msg = "    Measuring."
 
-        self.statusBar.showMessage("    Measuring.")
+        if n_queued > 0:
+            msg += f" {n_queued} sweep(s) queued."
+
+        self.statusBar.showMessage(msg)
         self.led.setChecked(True)
 
     def _gui_state_idle(self):
@@ -626,10 +1312,17 @@ class KeithleyGuiApp(QtWidgets.QMainWindow):
 
         self.pushButtonRun.setEnabled(True)
         self.pushButtonAbort.setEnabled(False)
+        self.sequencer.pushButtonRun.setEnabled(True)
 
         self.actionConnect.setEnabled(False)
         self.actionDisconnect.setEnabled(True)
-        self.statusBar.showMessage("    Ready.")
+        self.actionSettings.setEnabled(True)
+        self.pushButtonCancelConnect.hide()
+
+        if isinstance(self.keithley, SimulatedKeithley2600):
+            self.statusBar.showMessage("    Ready (simulated Keithley).")
+        else:
+            self.statusBar.showMessage("    Ready.")
         self.led.setChecked(True)
 
     def _gui_state_disconnected(self):
@@ -637,119 +1330,413 @@ class KeithleyGuiApp(QtWidgets.QMainWindow):
 
         self.pushButtonRun.setEnabled(False)
         self.pushButtonAbort.setEnabled(False)
+        self.sequencer.pushButtonRun.setEnabled(False)
 
-        self.actionConnect.setEnabled(True)
+        # wait for a cancelled connection attempt to return before starting another
+        self.actionConnect.setEnabled(self.connectThread is None)
         self.actionDisconnect.setEnabled(False)
+        self.actionSettings.setEnabled(True)
+        self.pushButtonCancelConnect.hide()
+
         self.statusBar.showMessage("    No Keithley connected.")
         self.led.setChecked(False)
 
+    def _gui_state_connecting(self):
+        """Set GUI to state while connecting to Keithley in the background."""
+
+        self.pushButtonRun.setEnabled(False)
+        self.pushButtonAbort.setEnabled(False)
+        self.sequencer.pushButtonRun.setEnabled(False)
+
+        self.actionConnect.setEnabled(False)
+        self.actionDisconnect.setEnabled(False)
+        self.actionSettings.setEnabled(False)
+        self.pushButtonCancelConnect.show()
+
+        address = self.connectThread.visa_address
+        self.statusBar.showMessage(f"    Connecting to {address}...")
+        self.led.setChecked(False)
+
 
 # noinspection PyUnresolvedReferences
 class MeasureThread(QtCore.QThread):
+    """
+    Long-lived measurement worker. Sweep jobs are queued with :meth:`submit` and run
+    one after another, without creating a new thread for every sweep.
+
+    :param keithley: Keithley2600 instance.
+    :param journal_dir: Directory for the journals of sweeps without a save template.
+        Defaults to the recovery folder in the config directory.
+    """
 
-    started_sig = QtCore.pyqtSignal()
+    started_sig = QtCore.pyqtSignal(object)
+    progress_sig = QtCore.pyqtSignal(object, object)
     finished_sig = QtCore.pyqtSignal(object)
     error_sig = QtCore.pyqtSignal(object)
+    state_sig = QtCore.pyqtSignal(object)
+    queue_sig = QtCore.pyqtSignal(int)
 
-    def __init__(self, keithley, params):
+    def __init__(self, keithley, journal_dir=None):
         QtCore.QThread.__init__(self)
         self.keithley = keithley
-        self.params = params
+        self.journal_dir = journal_dir
+        self.current_job = None
+        self.smu_cache = measurement.SMUSettingsCache()
+        self._queue = queue.Queue()
+
+    @property
+    def queue_depth(self):
+        """Number of sweep jobs waiting to run."""
+        return self._queue.qsize()
+
+    @property
+    def busy(self):
+        """``True`` if a sweep job is running or waiting to run."""
+        return self.current_job is not None or self.queue_depth > 0
+
+    def submit(self, params, smu_settings, save_template=None, index=1):
+        """
+        Queues a new sweep job.
+
+        :param params: Dictionary of sweep parameters.
+        :param smu_settings: Dictionary of SMU settings to apply before the sweep.
+        :param save_template: Optional path template to save the sweep data.
+        :param index: Index of the job in a sequence.
+        :returns: The queued :class:`SweepJob`.
+        """
+        job = SweepJob(params, smu_settings, save_template, index)
+        self._queue.put(job)
+        self.state_sig.emit(job)
+        self.queue_sig.emit(self.queue_depth)
+
+        return job
+
+    def cancel_pending(self):
+        """Cancels all sweep jobs which have not started yet."""
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if job is not None:
+                self._set_state(job, SweepJob.CANCELLED)
+
+        self.queue_sig.emit(self.queue_depth)
 
-    def __del__(self):
+    def stop(self):
+        """Cancels all pending jobs and stops the worker after the current job."""
+        self.cancel_pending()
+        self._queue.put(None)
         self.wait()
 
     def run(self):
 
-        self.started_sig.emit()
+        while True:
+            job = self._queue.get()
 
-        try:
-            sweep_data = None
-
-            if self.params["sweep_type"] == "transfer":
-                sweep_data = self.keithley.transfer_measurement(
-                    self.params["smu_gate"],
-                    self.params["smu_drain"],
-                    self.params["VgStart"],
-                    self.params["VgStop"],
-                    self.params["VgStep"],
-                    self.params["VdList"],
-                    self.params["tInt"],
-                    self.params["delay"],
-                    self.params["pulsed"],
-                )
-            elif self.params["sweep_type"] == "output":
-                sweep_data = self.keithley.output_measurement(
-                    self.params["smu_gate"],
-                    self.params["smu_drain"],
-                    self.params["VdStart"],
-                    self.params["VdStop"],
-                    self.params["VdStep"],
-                    self.params["VgList"],
-                    self.params["tInt"],
-                    self.params["delay"],
-                    self.params["pulsed"],
-                )
+            if job is None:
+                break
 
-            elif self.params["sweep_type"] == "iv":
-                direction = np.sign(self.params["VStop"] - self.params["VStart"])
-                stp = direction * abs(self.params["VStep"])
+            self.current_job = job
+            self.queue_sig.emit(self.queue_depth)
 
-                # forward and reverse sweeps
-                sweeplist = np.arange(
-                    self.params["VStart"], self.params["VStop"] + stp, stp
-                )
-                sweeplist = np.append(sweeplist, np.flip(sweeplist))
-
-                v, i = self.keithley.voltage_sweep_single_smu(
-                    self.params["smu_sweep"],
-                    sweeplist,
-                    self.params["tInt"],
-                    self.params["delay"],
-                    self.params["pulsed"],
-                )
+            try:
+                self.run_job(job)
+            finally:
+                self.current_job = None
 
-                params = {
-                    "sweep_type": "iv",
-                    "t_int": self.params["tInt"],
-                    "delay": self.params["delay"],
-                    "pulsed": self.params["pulsed"],
-                }
-
-                sweep_data = FETResultTable(
-                    column_titles=["Voltage", "Current"],
-                    units=["V", "A"],
-                    data=np.array([v, i]).transpose(),
-                    params=params,
-                )
+            self.queue_sig.emit(self.queue_depth)
+
+    def run_job(self, job):
+        """
+        Applies the SMU settings of a job and records its sweep. The data is saved
+        by :class:`SaveThread`, so that the next sweep does not wait for it.
+        """
+
+        self._set_state(job, SweepJob.RUNNING)
+        self.started_sig.emit(job)
+
+        def callback(sweep_data):
+            self.progress_sig.emit(job, sweep_data)
+
+        measurement.run_job(
+            self.keithley,
+            job,
+            callback,
+            self.smu_cache,
+            save=False,
+            journal_dir=self.journal_dir or get_conf_path(SUBFOLDER, RECOVERY_FOLDER),
+        )
+        self.state_sig.emit(job)
+
+        if job.state == SweepJob.FAILED:
+            self.error_sig.emit(job)
+        else:
+            self.finished_sig.emit(job)
+
+    def _set_state(self, job, state):
+        job.state = state
+        self.state_sig.emit(job)
+
+
+# noinspection PyUnresolvedReferences
+class SaveThread(QtCore.QThread):
+    """
+    Long-lived I/O worker which saves the data of completed sweep jobs to the paths
+    given by their save templates. Jobs are queued with :meth:`submit`. Failures are
+    stored in the job and reported by :attr:`error_sig`.
+    """
+
+    saved_sig = QtCore.pyqtSignal(object)
+    error_sig = QtCore.pyqtSignal(object)
+
+    def __init__(self):
+        QtCore.QThread.__init__(self)
+        self._queue = queue.Queue()
+
+    def submit(self, job):
+        """Queues a completed sweep job to be saved."""
+        self._queue.put(job)
+
+    def stop(self):
+        """Saves all queued jobs and stops the worker."""
+        self._queue.put(None)
+        self.wait()
 
-            self.keithley.beeper.beep(0.3, 2400)
-            self.keithley.reset()
+    def run(self):
+
+        while True:
+            job = self._queue.get()
+
+            if job is None:
+                break
+
+            try:
+                with job.timer.phase("save"):
+                    measurement.save_job(job)
+            except Exception as exc:
+                job.error = exc
+                job.state = SweepJob.FAILED
+                logger.warning("%s: could not save: %s", job, exc)
+                self.error_sig.emit(job)
+            else:
+                logger.info("%s: saved in %.3g s", job, job.timer.durations["save"])
+                self.saved_sig.emit(job)
+
+
+class _UnconnectedKeithley:
+    """
+    Holds the connection settings in place of a Keithley instance if none could be
+    created, e.g., because the VISA library failed to load. It never connects, a new
+    instance is created once the settings have been changed.
+    """
+
+    connected = False
+
+    def __init__(self, visa_address, visa_library):
+        self.visa_address = visa_address
+        self.visa_library = visa_library
+        self._connection_kwargs = dict()
+
+    def connect(self, **kwargs):
+        return False
+
+    def disconnect(self):
+        pass
+
+
+# noinspection PyUnresolvedReferences
+class ConnectThread(QtCore.QThread):
+    """
+    Connects to Keithley in the background. Connection attempts to an unreachable
+    instrument block until the VISA timeout and cannot be interrupted. Set
+    :attr:`cancelled` to mark the result as no longer wanted.
+
+    :param visa_address: VISA address for a new Keithley instance.
+    :param visa_library: VISA library for a new Keithley instance.
+    :param keithley: Existing Keithley instance to reconnect. If ``None``, a new
+        instance is created, which connects on creation.
+    """
+
+    result_sig = QtCore.pyqtSignal(object, object)
+
+    def __init__(self, visa_address, visa_library, keithley=None, parent=None):
+        QtCore.QThread.__init__(self, parent)
+        self.visa_address = keithley.visa_address if keithley else visa_address
+        self.visa_library = visa_library
+        self.keithley = keithley
+        self.profile = None
+        self.cancelled = False
+        self.interactive = True
+
+    def run(self):
+
+        error = None
+
+        try:
+            if self.keithley is None:
+                self.keithley = create_keithley(self.visa_address, self.visa_library)
+            else:
+                self.keithley.connect()
 
-            self.finished_sig.emit(sweep_data)
+            self.profile = _get_profile(self.keithley)
         except Exception as exc:
-            self.error_sig.emit(exc)
+            # the VISA library may fail to load, report this instead of crashing
+            error = exc
 
+        self.result_sig.emit(self.keithley, error)
 
-def run():
 
-    import sys
-    import argparse
-    from keithley2600 import log_to_screen
+# noinspection PyUnresolvedReferences
+class ConnectionMonitor(QtCore.QThread):
+    """
+    Checks in the background if Keithley is still reachable, so that a slow or broken
+    connection does not block the GUI. Failed checks are retried with an increasing
+    interval before Keithley is disconnected. No checks are made while a measurement
+    is running.
+
+    :param keithley: Keithley2600 instance.
+    :param is_busy: Optional callable which returns ``True`` while measuring.
+    """
+
+    state_sig = QtCore.pyqtSignal(bool)
+
+    INTERVAL = 10  # sec between checks
+    RETRY_INTERVAL = 1  # sec before the first retry, doubled for every further retry
+    MAX_FAILURES = 3  # failed checks before disconnecting
+    MAX_LINK_LOAD = 0.01  # max fraction of time spent on checks over slow links
+
+    def __init__(self, keithley, is_busy=None):
+        QtCore.QThread.__init__(self)
+        self.keithley = keithley
+        self.is_busy = is_busy or (lambda: False)
+
+        self.connected = None
+        self._failures = 0
+        self._wake = threading.Event()
+        self._stopped = False
+
+    def check_now(self):
+        """Triggers a check without waiting for the current interval to expire."""
+        self._wake.set()
+
+    def stop(self):
+        """Stops the monitor after the current check."""
+        self._stopped = True
+        self._wake.set()
+        self.wait()
+
+    def run(self):
+
+        while not self._stopped:
+            interval = self.check()
+            self._wake.wait(interval)
+            self._wake.clear()
+
+    def check(self):
+        """Checks the connection once and returns the time until the next check."""
+
+        keithley = self.keithley
+
+        if keithley is None or not keithley.connected:
+            self._failures = 0
+            self._set_connected(False)
+            return self.INTERVAL
+
+        if keithley.busy or self.is_busy():
+            return self.INTERVAL
+
+        t0 = time.perf_counter()
+
+        try:
+            keithley.localnode.model
+        except (
+            pyvisa.VisaIOError,
+            pyvisa.InvalidSession,
+            OSError,
+            KeithleyIOError,
+        ):
+            self._failures += 1
+
+            if self._failures < self.MAX_FAILURES:
+                return self.RETRY_INTERVAL * 2 ** (self._failures - 1)
+
+            logger.info("Connection to Keithley lost after %s checks", self._failures)
+            self._failures = 0
+            keithley.disconnect()
+            self._set_connected(False)
+            return self.INTERVAL
+
+        self._failures = 0
+        self._set_connected(True)
+
+        # check less often if the link is slow
+        latency = time.perf_counter() - t0
+        return max(self.INTERVAL, latency / self.MAX_LINK_LOAD)
+
+    def _set_connected(self, connected):
+        if connected != self.connected:
+            self.connected = connected
+            self.state_sig.emit(connected)
+
+
+def launch_gui(keithley=None, startup_timer=None):
+    """
+    Starts a Qt application with the Keithley GUI.
+
+    :param keithley: Optional Keithley instance to use instead of the one given by the
+        connection settings, e.g., a simulated instrument.
+    :param startup_timer: Optional :class:`keithleygui.measurement.PhaseTimer`. If
+        given, the startup time is profiled and printed as soon as the window is shown
+        and the application quits.
+    :returns: Exit code of the application.
+    """
+
+    timer = startup_timer or measurement.PhaseTimer()
+
+    with timer.phase("qapplication"):
+        app = QtWidgets.QApplication(sys.argv)
+
+    with timer.phase("window"):
+        keithley_gui = KeithleyGuiApp(keithley)
 
-    parser = argparse.ArgumentParser()
-    parser.add_argument(
-        "-v", "--verbose", help="increase output verbosity", action="store_true"
+    with timer.phase("show"):
+        keithley_gui.show()
+
+    if startup_timer is not None:
+        t_shown = time.perf_counter()
+
+        def report():
+            # runs once all events queued during startup have been processed
+            timer.add("events", time.perf_counter() - t_shown)
+            _print_startup_profile(timer, keithley_gui.startup_timer)
+            keithley_gui.exit_()
+            app.exit(0 if timer.total < STARTUP_BUDGET else 1)
+
+        QtCore.QTimer.singleShot(0, report)
+
+    return app.exec()
+
+
+def _print_startup_profile(timer, window_timer, stream=sys.stderr):
+
+    total = timer.total
+    status = "within" if total < STARTUP_BUDGET else "exceeds"
+
+    print(
+        f"Startup took {total:.3f} s, {status} budget of {STARTUP_BUDGET} s",
+        file=stream,
     )
-    args = parser.parse_args()
-    if args.verbose:
-        log_to_screen()
+    print(f"  {timer}", file=stream)
+    print(f"  window: {window_timer}", file=stream)
+
+
+def run():
 
-    app = QtWidgets.QApplication(sys.argv)
+    from keithleygui.cli import run as run_cli
 
-    keithley_gui = KeithleyGuiApp()
-    keithley_gui.show()
-    app.exec()
+    run_cli()
 
 
 if __name__ == "__main__":
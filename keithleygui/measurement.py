@@ -0,0 +1,630 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © keithleygui Project Contributors
+# Licensed under the terms of the MIT License
+# (see LICENSE.txt for details)
+
+"""
+Sweep routines shared by the GUI and the headless recipe runner.
+
+This module does not import any PyQt object, so that sweeps can be run without a
+display or a Qt installation.
+"""
+
+# system imports
+import os
+import os.path as osp
+import time
+import logging
+import itertools
+import threading
+import contextlib
+
+# external imports
+import numpy as np
+from keithley2600 import FETResultTable
+
+# local imports
+from keithleygui.datafile import save_sweep, is_npz, SweepJournal, JOURNAL_EXT
+
+logger = logging.getLogger(__name__)
+
+# phases of a sweep job, in the order in which they occur
+PHASES = ("validation", "smu_settings", "sweep", "beep", "reset", "save", "plot")
+
+
+class PhaseTimer:
+    """
+    Accumulates the wall time spent in the phases of a sweep job. Phases may be timed
+    from different threads, e.g., the sweep in the worker and plotting in the GUI.
+
+    :cvar durations: Dictionary with phase names as keys and durations in sec as values.
+    """
+
+    def __init__(self):
+        self.durations = dict()
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Context manager which adds the time spent in its block to a phase."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - t0)
+
+    def add(self, name, duration):
+        """Adds ``duration`` sec to a phase."""
+        with self._lock:
+            self.durations[name] = self.durations.get(name, 0.0) + duration
+
+    @property
+    def total(self):
+        """Total duration of all phases in sec."""
+        return sum(d for _, d in self._ordered())
+
+    def as_params(self):
+        """Returns the durations as flat parameters for a result table."""
+        return {f"duration_{name}": round(d, 6) for name, d in self._ordered()}
+
+    def _ordered(self):
+        order = {name: i for i, name in enumerate(PHASES)}
+
+        with self._lock:
+            items = list(self.durations.items())
+
+        return sorted(items, key=lambda x: order.get(x[0], len(order)))
+
+    def __str__(self):
+        return ", ".join(f"{name} {d:.3g} s" for name, d in self._ordered())
+
+
+class SweepJob:
+    """
+    A sweep to be run by :func:`run_job`.
+
+    :param params: Dictionary of sweep parameters, as created by
+        :meth:`KeithleyGuiApp.get_sweep_params`.
+    :param smu_settings: Dictionary of SMU settings, as created by
+        :meth:`KeithleyGuiApp.get_smu_settings`.
+    :param save_template: Optional path template. If given, the sweep data is saved
+        to the formatted path as soon as the sweep has completed.
+    :param index: Index of the job in a sequence, available in the save template.
+
+    :cvar state: Current state of the job.
+    :cvar sweep_data: Recorded sweep data once the job has completed.
+    :cvar save_path: Path where the sweep data is saved, if any.
+    :cvar journal_path: Path of the journal with the sub-sweeps recorded so far, if
+        any. It is removed once the data has been saved.
+    :cvar error: Exception raised by the sweep if it failed.
+    :cvar timer: :class:`PhaseTimer` with the durations of the job's phases.
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    ABORTED = "aborted"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+    _ids = itertools.count(1)
+
+    def __init__(self, params, smu_settings, save_template=None, index=1):
+        self.id = next(self._ids)
+        self.params = params
+        self.smu_settings = smu_settings
+        self.save_template = save_template
+        self.index = index
+        self.state = self.QUEUED
+        self.sweep_data = None
+        self.save_path = None
+        self.journal_path = None
+        self.error = None
+        self.timer = PhaseTimer()
+
+    def attach_timings(self):
+        """Adds the phase durations recorded so far to the sweep data parameters."""
+        if self.sweep_data is not None:
+            self.sweep_data.params.update(self.timer.as_params())
+
+    def format_save_path(self):
+        """
+        Returns the save path for the job's sweep data, created from the save
+        template with the sweep parameters, the job index and the current time.
+        """
+        return format_save_path(self.save_template, self.params, self.index)
+
+    def __repr__(self):
+        sweep_type = self.params["sweep_type"]
+        return f"<{self.__class__.__name__}({self.id}, {sweep_type}, {self.state})>"
+
+
+def format_save_path(template, params, index=1):
+    """
+    Returns a save path created from a template with the sweep parameters, the index
+    of the sweep and the current time as fields.
+    """
+    fields = dict(params)
+    fields["index"] = index
+    fields["time"] = time.strftime("%Y-%m-%d_%H-%M-%S")
+
+    return template.format(**fields)
+
+
+def check_save_template(template, sweeps):
+    """
+    Checks that a save template can be formatted for a list of sweeps, before they
+    are run. Raises a ValueError describing the problem otherwise.
+
+    :param template: Path template.
+    :param sweeps: List of sweep parameters, the index of a sweep is its position in
+        the list, starting at 1.
+    """
+    for index, params in enumerate(sweeps, start=1):
+        try:
+            format_save_path(template, params, index)
+        except KeyError as exc:
+            raise ValueError(f"Unknown field {exc} in template '{template}'.") from exc
+        except (IndexError, ValueError, AttributeError, TypeError) as exc:
+            raise ValueError(f"Invalid template '{template}': {exc}") from exc
+
+
+def run_job(keithley, job, callback=None, smu_cache=None, save=True, journal_dir=None):
+    """
+    Applies the SMU settings of a job, records its sweep and saves the data if the
+    job has a save template. Errors are not raised but stored in :attr:`SweepJob.error`.
+    The duration of every phase is recorded in :attr:`SweepJob.timer` and logged.
+
+    Completed sub-sweeps are written to a journal next to the save path or in
+    ``journal_dir`` while the sweep is running. The journal is kept if the job fails
+    or is aborted, so that the recorded data is not lost.
+
+    :param keithley: Keithley2600 instance.
+    :param job: The :class:`SweepJob` to run.
+    :param callback: Optional callable which is passed a copy of the data recorded so
+        far after every completed sub-sweep.
+    :param smu_cache: Optional :class:`SMUSettingsCache` to skip SMU settings which
+        are already in place. It should be reused for all jobs on the same Keithley.
+    :param save: If ``False``, the data is not saved even if the job has a save
+        template. Call :func:`save_job` later, e.g., from a different thread.
+    :param journal_dir: Directory for journals of jobs without a save template. Such
+        jobs are not journaled if ``None``. Their journal is kept until the caller
+        has saved the data and calls :func:`remove_journal`.
+    """
+
+    job.state = SweepJob.RUNNING
+    timer = job.timer
+    journal = None
+
+    try:
+        keithley.abort_event.clear()
+
+        journal = _open_journal(job, journal_dir)
+
+        def on_sub_sweep(sweep_data):
+            if journal is not None:
+                journal.write(sweep_data)
+            if callback is not None:
+                callback(sweep_data)
+
+        with timer.phase("smu_settings"):
+            apply_smu_settings(keithley, job.smu_settings, smu_cache)
+        with timer.phase("sweep"):
+            job.sweep_data = measure(keithley, job.params, on_sub_sweep)
+            if journal is not None:
+                journal.write(job.sweep_data)  # sweeps without sub-sweeps
+        with timer.phase("beep"):
+            keithley.beeper.beep(0.3, 2400)
+        with timer.phase("reset"):
+            keithley.reset()
+            if smu_cache is not None:
+                smu_cache.on_reset(keithley)
+
+        job.attach_timings()
+
+        if save and job.save_template and not keithley.abort_event.is_set():
+            with timer.phase("save"):
+                save_job(job)
+            job.attach_timings()
+    except Exception as exc:
+        job.error = exc
+        job.state = SweepJob.FAILED
+    else:
+        if keithley.abort_event.is_set():
+            job.state = SweepJob.ABORTED
+        else:
+            job.state = SweepJob.DONE
+    finally:
+        if journal is not None:
+            journal.close()
+
+    if job.journal_path is not None:
+        if journal is None or journal.ncols == 0:
+            remove_journal(job)  # nothing recorded
+        elif job.state in (SweepJob.FAILED, SweepJob.ABORTED):
+            logger.info("%s: recorded data kept in %s", job, job.journal_path)
+
+    logger.info("%s: %.3g s (%s)", job, timer.total, timer)
+
+
+def save_job(job):
+    """
+    Saves the sweep data of a job to the path given by its save template and removes
+    its journal. Sweeps are appended to existing NumPy archives. Other existing files
+    are not replaced, a counter is appended to the file name instead.
+    """
+    if job.save_path is None:
+        job.save_path = job.format_save_path()
+
+    # sweeps of a sequence may be collected in a single archive, but sweeps which
+    # finish within the same second must not replace each other's files
+    if not is_npz(job.save_path):
+        job.save_path = _unique_path(job.save_path)
+
+    directory = osp.dirname(job.save_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    save_sweep(job.sweep_data, job.save_path, append=True)
+    remove_journal(job)
+
+
+def _unique_path(path):
+    """Appends the lowest free counter to the file name if ``path`` exists."""
+    root, ext = osp.splitext(path)
+    counter = 1
+
+    while osp.exists(path):
+        counter += 1
+        path = f"{root}_{counter}{ext}"
+
+    return path
+
+
+def _open_journal(job, journal_dir):
+    """
+    Creates the journal for a job's sweep data, if it has a place to go. Returns
+    ``None`` if the journal cannot be created, the sweep is run anyway and invalid
+    save paths are reported when saving.
+    """
+
+    try:
+        if job.save_template:
+            # the journal of every job is unique, also if jobs append to the same file
+            job.save_path = job.format_save_path()
+            path = f"{job.save_path}.{job.id}{JOURNAL_EXT}"
+        elif journal_dir is not None:
+            name = f"{job.params['sweep_type']}_{time.strftime('%Y-%m-%d_%H-%M-%S')}"
+            path = osp.join(journal_dir, f"{name}.{job.id}{JOURNAL_EXT}")
+        else:
+            return None
+
+        journal = SweepJournal(path)
+    except Exception as exc:
+        logger.warning("%s: cannot write journal: %s", job, exc)
+        return None
+
+    job.journal_path = path
+
+    return journal
+
+
+def remove_journal(job):
+    """Removes the journal of a job once its data has been saved."""
+    if job.journal_path is not None:
+        try:
+            os.remove(job.journal_path)
+        except FileNotFoundError:
+            pass
+        job.journal_path = None
+
+
+class SMUSettingsCache:
+    """
+    Last known values of the SMU settings on the instrument. This allows
+    :func:`apply_smu_settings` to skip settings which are already in place, saving a
+    VISA round-trip for each of them.
+
+    :meth:`on_reset` must be called after every ``keithley.reset()``. It restores the
+    cached values to the instrument's reset defaults, which are read once per
+    connection after the first reset. The cache is cleared when used with a different
+    Keithley instance or after a reconnect.
+    """
+
+    SENSE_MODES = ("SENSE_LOCAL", "SENSE_REMOTE")
+
+    def __init__(self):
+        self._keithley = None
+        self._connection = None
+        self._values = dict()
+        self._defaults = None
+        self._constants = dict()
+
+    def clear(self):
+        """Forgets all cached values, including the reset defaults."""
+        self._values = dict()
+        self._defaults = None
+        self._constants = dict()
+
+    def check_connection(self, keithley):
+        """Clears the cache if ``keithley`` or its connection have changed."""
+        connection = getattr(keithley, "connection", None)
+
+        if keithley is not self._keithley or connection is not self._connection:
+            self.clear()
+            self._keithley = keithley
+            self._connection = connection
+
+    def get(self, smu_name, attr):
+        """Returns the cached value of an SMU attribute or ``None`` if unknown."""
+        return self._values.get(smu_name, {}).get(attr)
+
+    def set(self, smu_name, attr, value):
+        """Sets the cached value of an SMU attribute."""
+        self._values.setdefault(smu_name, {})[attr] = value
+
+    def discard(self, smu_name, attr):
+        """Marks the value of an SMU attribute as unknown."""
+        self._values.get(smu_name, {}).pop(attr, None)
+
+    def constant(self, smu, name):
+        """Returns the value of an SMU constant such as ``SENSE_LOCAL``."""
+        if name not in self._constants:
+            self._constants[name] = getattr(smu, name)
+
+        return self._constants[name]
+
+    def on_reset(self, keithley):
+        """Restores the cached values to the defaults after ``keithley.reset()``."""
+        self.check_connection(keithley)
+
+        if self._defaults is None:
+            try:
+                self._defaults = self._read_defaults(keithley)
+            except Exception as exc:
+                logger.debug("Could not read SMU defaults: %r", exc)
+                self._values = dict()
+                return
+
+        self._values = {name: dict(values) for name, values in self._defaults.items()}
+
+    def _read_defaults(self, keithley):
+        """Reads the settings of all cached SMUs from the instrument."""
+        defaults = dict()
+
+        for name in self._values:
+            smu = getattr(keithley, name)
+            values = dict()
+
+            for attr in SMU_ATTRIBUTES:
+                value = _get_nested(smu, attr)
+
+                if attr == "sense":
+                    for mode in self.SENSE_MODES:
+                        if value == self.constant(smu, mode):
+                            value = mode
+
+                values[attr] = value
+
+            defaults[name] = values
+
+        return defaults
+
+
+# SMU attributes set by apply_smu_settings, in the order in which they are written
+SMU_ATTRIBUTES = (
+    "sense",
+    "source.limiti",
+    "trigger.source.limiti",
+    "source.limitv",
+    "trigger.source.limitv",
+    "source.highc",
+)
+
+
+def apply_smu_settings(keithley, smu_settings, cache=None):
+    """
+    Applies SMU settings to Keithley before a measurement.
+    Warning: keithley.reset() will reset those settings.
+
+    :param keithley: Keithley2600 instance.
+    :param smu_settings: Dictionary with SMU names as keys and dictionaries with
+        "sense", "limiti", "limitv" and "highc" entries as values.
+    :param cache: Optional :class:`SMUSettingsCache`. If given, only settings which
+        differ from the cached values are sent to the Keithley.
+    """
+
+    if cache is None:
+        cache = SMUSettingsCache()
+
+    cache.check_connection(keithley)
+
+    for name, settings in smu_settings.items():
+
+        smu = getattr(keithley, name)
+
+        values = {
+            "sense": settings["sense"],
+            "source.limiti": settings["limiti"],
+            "trigger.source.limiti": settings["limiti"],
+            "source.limitv": settings["limitv"],
+            "trigger.source.limitv": settings["limitv"],
+            "source.highc": int(settings["highc"]),
+        }
+
+        if values["sense"] not in SMUSettingsCache.SENSE_MODES:
+            del values["sense"]
+
+        for attr, value in values.items():
+
+            if cache.get(name, attr) == value:
+                continue
+
+            cache.discard(name, attr)
+
+            if attr == "sense":
+                _set_nested(smu, attr, cache.constant(smu, value))
+            else:
+                _set_nested(smu, attr, value)
+
+            cache.set(name, attr, value)
+
+
+def _get_nested(obj, attr):
+    for name in attr.split("."):
+        obj = getattr(obj, name)
+    return obj
+
+
+def _set_nested(obj, attr, value):
+    path, _, name = attr.rpartition(".")
+
+    if path:
+        obj = _get_nested(obj, path)
+
+    setattr(obj, name, value)
+
+
+def measure(keithley, params, callback=None):
+    """
+    Records a transfer, output or IV sweep.
+
+    :param keithley: Keithley2600 instance.
+    :param params: Dictionary of sweep parameters.
+    :param callback: Optional callable which is passed a copy of the data recorded so
+        far after every completed sub-sweep.
+    :returns: Sweep data.
+    """
+
+    if params["sweep_type"] in ("transfer", "output"):
+        return fet_measurement(keithley, params, callback)
+    elif params["sweep_type"] == "iv":
+        return iv_measurement(keithley, params)
+    else:
+        raise ValueError(f"Unknown sweep type '{params['sweep_type']}'.")
+
+
+def iv_measurement(keithley, params):
+    """
+    Records an IV curve with forward and reverse sweeps on a single SMU.
+
+    :returns: IV curve data.
+    """
+    direction = np.sign(params["VStop"] - params["VStart"])
+    stp = direction * abs(params["VStep"])
+
+    # forward and reverse sweeps
+    sweeplist = np.arange(params["VStart"], params["VStop"] + stp, stp)
+    sweeplist = np.append(sweeplist, np.flip(sweeplist))
+
+    v, i = keithley.voltage_sweep_single_smu(
+        getattr(keithley, params["smu_sweep"]),
+        sweeplist,
+        params["tInt"],
+        params["delay"],
+        params["pulsed"],
+    )
+
+    return FETResultTable(
+        column_titles=["Voltage", "Current"],
+        units=["V", "A"],
+        data=np.array([v, i]).transpose(),
+        params={
+            "sweep_type": "iv",
+            "t_int": params["tInt"],
+            "delay": params["delay"],
+            "pulsed": params["pulsed"],
+        },
+    )
+
+
+def fet_measurement(keithley, params, callback=None):
+    """
+    Records a transfer or output curve with forward and reverse sweeps. This mirrors
+    :meth:`Keithley2600.transfer_measurement` and
+    :meth:`Keithley2600.output_measurement` but calls ``callback`` with a copy of the
+    data recorded so far after every completed sub-sweep.
+
+    :returns: Transfer or output curve data.
+    """
+
+    smu_gate = getattr(keithley, params["smu_gate"])
+    smu_drain = getattr(keithley, params["smu_drain"])
+
+    if params["sweep_type"] == "transfer":
+        smu_sweep, smu_step = smu_gate, smu_drain
+        start, stop = params["VgStart"], params["VgStop"]
+        step, step_list = params["VgStep"], params["VdList"]
+        sweep_name, step_label = "Gate voltage", "Vd"
+    else:
+        smu_sweep, smu_step = smu_drain, smu_gate
+        start, stop = params["VdStart"], params["VdStop"]
+        step, step_list = params["VdStep"], params["VgList"]
+        sweep_name, step_label = "Drain voltage", "Vg"
+
+    # create array with sweep voltage steps, always include a step >= stop
+    step = np.sign(stop - start) * abs(step)
+    sweeplist_fwd = np.arange(start, stop + step, step)
+    sweeplist = np.append(sweeplist_fwd, np.flip(sweeplist_fwd, 0))
+
+    sweep_data = FETResultTable(
+        params={
+            "sweep_type": params["sweep_type"],
+            "time": time.time(),
+            "time_str": time.strftime("%d/%m/%Y %H:%M"),
+            "t_int": params["tInt"],
+            "delay": params["delay"],
+            "pulsed": params["pulsed"],
+        }
+    )
+    sweep_data.append_column(sweeplist, name=sweep_name, unit="V")
+
+    # hold the lock across all sub-sweeps like the driver, so that keithley.busy
+    # stays True and nobody else can use the instrument between them
+    with keithley._measurement_lock:
+        for v_step in step_list:
+
+            if keithley.abort_event.is_set():
+                break
+
+            if v_step == "trailing":
+                steplist = sweeplist
+            else:
+                steplist = np.full_like(sweeplist, v_step)
+
+            _, i_sweep, _, i_step = keithley.voltage_sweep_dual_smu(
+                smu_sweep,
+                smu_step,
+                sweeplist,
+                steplist,
+                params["tInt"],
+                params["delay"],
+                params["pulsed"],
+            )
+
+            if keithley.abort_event.is_set():
+                break
+
+            if params["sweep_type"] == "transfer":
+                i_g, i_d = i_sweep, i_step
+            else:
+                i_d, i_g = i_sweep, i_step
+
+            i_s = np.array(i_d) + np.array(i_g)
+            label = f"{step_label} = {v_step}"
+            sweep_data.append_column(i_s, name=f"Source current ({label})", unit="A")
+            sweep_data.append_column(i_d, name=f"Drain current ({label})", unit="A")
+            sweep_data.append_column(i_g, name=f"Gate current ({label})", unit="A")
+
+            if callback is not None:
+                # pass a copy, the GUI thread may plot it while we keep measuring
+                snapshot = FETResultTable(
+                    column_titles=sweep_data.column_names,
+                    units=sweep_data.column_units,
+                    data=sweep_data.data,
+                    params=dict(sweep_data.params),
+                )
+                callback(snapshot)
+
+    return sweep_data
@@ -5,7 +5,9 @@
 # (see LICENSE.txt for details)
 
 import sys
+import time
 import itertools
+import functools
 import pyqtgraph as pg
 from pyqtgraph import functions as fn
 import numpy as np
@@ -25,6 +27,147 @@ COLORS = [
 ]
 
 
+# ========================================================================================
+# Level of detail
+# ========================================================================================
+
+
+def _monotonic_segments(x):
+    """
+    Splits ``x`` into runs of increasing or decreasing values, e.g., the forward and
+    reverse parts of a sweep. Adjacent runs share their turning point.
+
+    :returns: List of (start, stop) index tuples.
+    """
+    steps = np.sign(np.diff(x))
+    i_steps = np.flatnonzero(steps)
+    signs = steps[i_steps]
+    turns = i_steps[1:][signs[1:] != signs[:-1]]
+
+    starts = [0] + list(turns)
+    stops = [t + 1 for t in turns] + [len(x)]
+
+    return list(zip(starts, stops))
+
+
+def decimate(x, ys, x_range, n_bins):
+    """
+    Reduces curves to at most two points per bin by keeping the minimum and maximum of
+    every bin, so that the drawn envelope of the curves is preserved. Points outside of
+    ``x_range`` are dropped, except for one point on either side. ``x`` may change
+    direction, e.g., for forward and reverse sweeps.
+
+    :param x: 1D array of x-values shared by all curves.
+    :param ys: 2D array with the y-values of one curve per row.
+    :param x_range: Tuple (x_min, x_max) of the visible range.
+    :param n_bins: Number of bins, typically the width of the plot in pixels.
+    :returns: Tuple of the reduced x-values and y-values.
+    """
+    x_min, x_max = x_range
+    edges = np.linspace(x_min, x_max, n_bins + 1)
+
+    x_out, ys_out = [], []
+
+    for start, stop in _monotonic_segments(x):
+
+        xs, ys_seg = x[start:stop], ys[:, start:stop]
+        descending = len(xs) > 1 and xs[-1] < xs[0]
+
+        if descending:
+            xs, ys_seg = xs[::-1], ys_seg[:, ::-1]
+
+        # clip to view, keeping one point outside to draw lines to the edges
+        i0 = max(np.searchsorted(xs, x_min, side="left") - 1, 0)
+        i1 = min(np.searchsorted(xs, x_max, side="right") + 1, len(xs))
+        xs, ys_seg = xs[i0:i1], ys_seg[:, i0:i1]
+
+        if len(xs) > 2 * n_bins:
+            starts = np.unique(np.searchsorted(xs, edges))
+            starts = starts[starts < len(xs)]
+            starts[0] = 0
+
+            # fmin and fmax ignore NaN values unless a bin is all NaN
+            y_min = np.fmin.reduceat(ys_seg, starts, axis=1)
+            y_max = np.fmax.reduceat(ys_seg, starts, axis=1)
+
+            xs = np.repeat(xs[starts], 2)
+            ys_seg = np.empty((len(ys_seg), len(xs)))
+            ys_seg[:, 0::2] = y_max
+            ys_seg[:, 1::2] = y_min
+
+        if descending:
+            xs, ys_seg = xs[::-1], ys_seg[:, ::-1]
+
+        x_out.append(xs)
+        ys_out.append(ys_seg)
+
+    return np.concatenate(x_out), np.concatenate(ys_out, axis=1)
+
+
+def block_envelope(x, ys, n_blocks, chunk_size=2 ** 16):
+    """
+    Reduces curves to the range of their absolute values in blocks of consecutive
+    points. The data is read in chunks of about ``chunk_size`` values, so that large
+    or memory-mapped arrays are never loaded or copied as a whole. Small chunks whose
+    temporary arrays fit into the CPU cache are processed fastest.
+
+    :param x: 1D array of x-values shared by all curves.
+    :param ys: 2D array with the y-values of one curve per row.
+    :param n_blocks: Maximum number of blocks.
+    :param chunk_size: Number of values to process at once.
+    :returns: Dictionary with the index ("start") and x-value ("x_first") of the
+        first point of every block, the range of x-values ("x_min", "x_max"), the
+        range of absolute y-values ("y_min", "y_max") and the smallest positive
+        absolute y-value ("y_min_pos") of every block, with one row per curve.
+    """
+    n_points = len(x)
+    block_size = max(-(-n_points // n_blocks), 1)
+
+    # process whole blocks in every chunk
+    n_chunk = max(chunk_size // (max(len(ys), 1) * block_size), 1) * block_size
+
+    keys = ["x_first", "x_min", "x_max", "y_min", "y_max", "y_min_pos"]
+    chunks = {key: [] for key in keys}
+
+    for start in range(0, n_points, n_chunk):
+        stop = min(start + n_chunk, n_points)
+        starts = np.arange(0, stop - start, block_size)
+
+        xs = np.asarray(x[start:stop], dtype=float)
+        chunks["x_first"].append(xs[starts])
+        chunks["x_min"].append(np.fmin.reduceat(xs, starts))
+        chunks["x_max"].append(np.fmax.reduceat(xs, starts))
+
+        y_abs = np.abs(ys[:, start:stop])
+        chunks["y_min"].append(np.fmin.reduceat(y_abs, starts, axis=1))
+        chunks["y_max"].append(np.fmax.reduceat(y_abs, starts, axis=1))
+
+        # fmin ignores NaN values
+        y_abs[y_abs == 0] = np.nan
+        chunks["y_min_pos"].append(np.fmin.reduceat(y_abs, starts, axis=1))
+
+    envelope = {key: np.concatenate(chunks[key], axis=-1) for key in keys}
+    envelope["start"] = np.arange(0, n_points, block_size)
+
+    return envelope
+
+
+def transform(y, log_y):
+    """
+    Returns the absolute values of ``y`` or their log10 if ``log_y`` is ``True``, with
+    NaN for values which are not positive.
+    """
+    y_abs = np.abs(y)
+
+    if not log_y:
+        return y_abs
+
+    y_log = np.full_like(y_abs, np.nan)
+    np.log10(y_abs, out=y_log, where=y_abs > 0)
+
+    return y_log
+
+
 # ========================================================================================
 # The actual plot item
 # ========================================================================================
@@ -37,6 +180,24 @@ class SweepDataPlot(pg.GraphicsView):
     else:
         LW = 1.5
 
+    # curves with more points per pixel are decimated to the plot resolution
+    MAX_POINTS_PER_PIXEL = 2
+
+    # above this number of drawn points, curves are drawn without antialiasing
+    ANTIALIAS_MAX_POINTS = 20000
+
+    # data with more points is reduced to an overview of OVERVIEW_BLOCKS blocks per
+    # curve in chunks, instead of transforming it as a whole, and only the rows in
+    # view are read when zoomed in to at most MAX_VIEW_POINTS points
+    OVERVIEW_MIN_POINTS = 10 ** 7
+    OVERVIEW_BLOCKS = 2 ** 16
+    MAX_VIEW_POINTS = 2 * 10 ** 6
+
+    # live updates are drawn at most this many times per second, auto-ranging waits
+    # for a frame without new data but at most MAX_AUTORANGE_DELAY sec
+    MAX_FPS = 30
+    MAX_AUTORANGE_DELAY = 1.0
+
     _init_done = False
 
     def __init__(self, parent=None):
@@ -111,21 +272,68 @@ class SweepDataPlot(pg.GraphicsView):
         )
         self.legend.setParentItem(self.p.vb)
 
+        # curves which currently show data and all curves created so far, unused
+        # curves are hidden and kept for the next plot
+        self.lines = []
+        self._curves = []
+
+        # full resolution data of the shown curves with one curve per row, its
+        # transforms for linear and log scale or the overview of large data and the
+        # view for which it has been reduced to the displayed data
+        self._xdata = np.empty(0)
+        self._ydata = np.empty((0, 0))
+        self._transformed = dict()
+        self._overview = None
+        self._bounds = dict()
+        self._display_view = None
+
+        self.p.vb.sigXRangeChanged.connect(self._on_view_changed)
+        self.p.vb.sigResized.connect(self._on_view_changed)
+
+        # transform data for log scale here instead of in every curve, x-values are
+        # voltages and always shown on a linear scale
+        self.p.ctrl.logYCheck.toggled.disconnect()
+        self.p.ctrl.logYCheck.toggled.connect(self._on_log_mode_changed)
+        self.p.ctrl.logXCheck.setEnabled(False)
+
+        # coalesce live updates and draw them in frames
+        self._pending_data = None
+        self._autorange_pending = False
+        self._last_frame = 0.0
+        self._last_autorange = 0.0
+
+        self._frame_timer = QtCore.QTimer(self)
+        self._frame_timer.setSingleShot(True)
+        self._frame_timer.timeout.connect(self._on_frame)
+
         # update colors
         self.update_darkmode()
 
         self._init_done = True
 
     def clear(self):
-        self.p.clear()  # clear current plot
-        self.legend.clear()  # clear current legend
+        """Hides all curves and the legend. Both are kept for reuse by the next plot."""
+        self._pending_data = None
+        self._autorange_pending = False
+
+        for line in self.lines:
+            line.hide()
+        self.legend.hide()
+        self.lines = []
 
     def plot(self, sweep_data):
-        self.clear()
+        """
+        Formats the axes for the sweep type and plots ``sweep_data`` immediately.
+        Pending live updates are discarded.
+        """
+        self._pending_data = None
+        self._autorange_pending = False
+
+        # all curves are set below, don't update them for the old data when switching
+        # the log mode
+        self.lines = []
 
-        xdata = sweep_data.get_column(0)
         xdata_title = sweep_data.titles[0]
-        ydata = sweep_data.values()[1:]
 
         # format plot according to sweep type
         unit = xdata_title.unit if xdata_title.has_unit() else "a.u."
@@ -136,32 +344,286 @@ class SweepDataPlot(pg.GraphicsView):
             self.setTitle("Transfer curve")
             self.p.setLogMode(x=False, y=True)
             self.legend.setOffset((20, -20))  # legend in bottom-left corner
-            ydata = [np.abs(y) for y in ydata]
 
         elif sweep_data.params["sweep_type"] == "output":
             self.setTitle("Output curve")
             self.p.setLogMode(x=False, y=False)
             self.legend.setOffset((-20, 20))  # legend in top-right corner
-            ydata = [np.abs(y) for y in ydata]
 
         else:
             self.setTitle("Sweep curve")
             self.p.setLogMode(x=False, y=False)
-            ydata = [np.abs(y) for y in ydata]
 
         # plot data
-        self.lines = []
-        for y, c in zip(ydata, itertools.cycle(COLORS)):
-            p = self.p.plot(xdata, y, pen=fn.mkPen(color=c, width=self.LW))
-            self.lines.append(p)
+        self._draw(sweep_data)
+        self._autorange()
 
-        # add legend
-        for l, t in zip(self.lines, sweep_data.column_names[1:]):
-            self.legend.addItem(l, str(t))
+    def update_plot(self, sweep_data):
+        """
+        Schedules a live update with ``sweep_data`` while a sweep is running. Call
+        :meth:`plot` first to format the axes for the sweep type. Updates are drawn
+        at most :attr:`MAX_FPS` times per second, only the latest data is drawn if
+        several updates arrive within a frame.
+        """
+        self._pending_data = sweep_data
+
+        if not self._frame_timer.isActive():
+            delay = self._last_frame + 1 / self.MAX_FPS - time.monotonic()
+            self._frame_timer.start(max(int(delay * 1000), 0))
+
+    def _on_frame(self):
+
+        now = time.monotonic()
 
+        if self._pending_data is not None:
+            sweep_data, self._pending_data = self._pending_data, None
+            self._draw(sweep_data)
+            self._autorange_pending = True
+
+            if now - self._last_autorange > self.MAX_AUTORANGE_DELAY:
+                self._autorange()
+
+            # check in the next frame for new data or auto-range
+            self._last_frame = now
+            self._frame_timer.start(int(1000 / self.MAX_FPS))
+
+        elif self._autorange_pending:
+            self._autorange()
+            self._last_frame = now
+
+    def _autorange(self):
+        self._autorange_pending = False
+        self._last_autorange = time.monotonic()
         self.p.autoRange()
 
-        self.update_darkmode()
+    def _draw(self, sweep_data):
+        """
+        Updates existing curves in place and adds curves for new columns of
+        ``sweep_data``.
+        """
+        # views of the data, memory-mapped data is only read when needed
+        data = np.asarray(sweep_data.data, dtype=float).reshape(-1, sweep_data.ncols)
+        self._xdata = data[:, 0]
+        self._ydata = data[:, 1:].T
+
+        if not self._is_large():
+            self._ydata = np.ascontiguousarray(self._ydata)
+
+        self._transformed.clear()
+        self._overview = None
+        self._bounds.clear()
+        names = [str(name) for name in sweep_data.column_names[1:]]
+        n_lines = len(self._ydata)
+        self._display_view = None
+
+        # create curves only for more columns than have ever been plotted
+        n_old = len(self._curves)
+        colors = itertools.islice(itertools.cycle(COLORS), n_old, n_lines)
+
+        for c in colors:
+            line = self.p.plot(pen=fn.mkPen(color=c, width=self.LW))
+            line.setLogMode(False, False)  # data is already transformed
+            # auto-range to the full data, also if only the visible part is displayed
+            line.dataBounds = functools.partial(self._data_bounds, line)
+            self._curves.append(line)
+
+        for line in self._curves[:n_lines]:
+            line.show()
+
+        for line in self._curves[n_lines:]:
+            if line.isVisible():
+                line.hide()
+
+        self.lines = self._curves[:n_lines]
+
+        # show all data since the view will be auto-ranged
+        if len(self._xdata) > 0 and n_lines > 0:
+            self._update_display_data(self._full_x_range())
+
+        # add or remove legend entries only if the number of columns has changed
+        while len(self.legend.items) > n_lines:
+            self.legend.removeItem(self.legend.items[-1][0].item)
+
+        n_entries = len(self.legend.items)
+
+        for line, name in zip(self.lines[n_entries:], names[n_entries:]):
+            self.legend.addItem(line, name)
+
+        for (sample, label), name in zip(self.legend.items, names):
+            if label.text != name:
+                label.setText(name)
+
+        self.legend.show()
+
+    def _update_display_data(self, x_range):
+        """
+        Sets the data of all curves, reduced to the plot resolution if there are many
+        more points than pixels in ``x_range``.
+        """
+        n_pixels = int(self.p.vb.width()) or 1000
+        reduce = len(self._xdata) > self.MAX_POINTS_PER_PIXEL * n_pixels
+
+        # full resolution data does not depend on the view
+        view = (x_range, n_pixels) if reduce else "full"
+
+        if view == self._display_view:
+            return
+
+        self._display_view = view
+
+        # min and max are preserved by the transform, so decimate afterwards
+        if not reduce:
+            xdata, ydata = self._xdata, self._transformed_ydata()
+        elif self._is_large():
+            xdata, ydata = self._decimate_large(x_range, n_pixels)
+        else:
+            ydata = self._transformed_ydata()
+            xdata, ydata = decimate(self._xdata, ydata, x_range, n_pixels)
+
+        antialias = xdata.size * len(ydata) <= self.ANTIALIAS_MAX_POINTS
+
+        for line, y in zip(self.lines, ydata):
+            line.setData(xdata, y, antialias=antialias)
+
+    def _transformed_ydata(self):
+        """
+        Returns the absolute y-data or its log10 in log mode, with NaN for values
+        which are not positive. Both are computed once per dataset.
+        """
+        log_y = self.p.ctrl.logYCheck.isChecked()
+
+        if log_y not in self._transformed:
+            y_abs = self._transformed.get(False)
+
+            if y_abs is None:
+                y_abs = self._transformed[False] = np.abs(self._ydata)
+
+            if log_y:
+                self._transformed[True] = transform(y_abs, log_y=True)
+
+        return self._transformed[log_y]
+
+    def _is_large(self):
+        return self._ydata.size > self.OVERVIEW_MIN_POINTS
+
+    def _envelope(self):
+        """
+        Returns the x-value of the first point of every block of the overview and the
+        lower and upper bounds of the transformed y-data in every block.
+        """
+        if self._overview is None:
+            self._overview = block_envelope(
+                self._xdata, self._ydata, self.OVERVIEW_BLOCKS
+            )
+
+        ov = self._overview
+
+        if self.p.ctrl.logYCheck.isChecked():
+            lower, upper = ov["y_min_pos"], ov["y_max"]
+            return ov["x_first"], transform(lower, True), transform(upper, True)
+        else:
+            return ov["x_first"], ov["y_min"], ov["y_max"]
+
+    def _decimate_large(self, x_range, n_pixels):
+        """
+        Decimates large data from its overview or, if only few points are in view,
+        from the points of the blocks in view.
+        """
+        x_first, lower, upper = self._envelope()
+        ov = self._overview
+
+        # include the line to the next block and one block on either side, which
+        # holds the points outside of the view that lines to its edges are drawn to
+        x_next = np.append(x_first[1:], x_first[-1])
+        x_min = np.fmin(ov["x_min"], x_next)
+        x_max = np.fmax(ov["x_max"], x_next)
+
+        in_view = (x_max >= x_range[0]) & (x_min <= x_range[1])
+        in_view[1:] |= in_view[:-1].copy()
+        in_view[:-1] |= in_view[1:].copy()
+        blocks = np.flatnonzero(in_view)
+
+        if len(blocks) == 0:
+            return np.empty(0), np.empty((len(self._ydata), 0))
+
+        stops = np.append(ov["start"][1:], len(self._xdata))
+        n_points = (stops[blocks] - ov["start"][blocks]).sum() * len(self._ydata)
+
+        if n_points > self.MAX_VIEW_POINTS:
+            # draw every block as its upper and lower bound
+            xdata = np.repeat(x_first, 2)
+            ydata = np.empty((len(lower), len(xdata)))
+            ydata[:, 0::2] = upper
+            ydata[:, 1::2] = lower
+        else:
+            # read the points of runs of adjacent blocks
+            breaks = np.flatnonzero(np.diff(blocks) > 1)
+            firsts = blocks[np.append(0, breaks + 1)]
+            lasts = blocks[np.append(breaks, len(blocks) - 1)]
+            rows = [slice(ov["start"][i], stops[j]) for i, j in zip(firsts, lasts)]
+
+            xdata = np.concatenate([self._xdata[r] for r in rows])
+            ydata = np.concatenate([self._ydata[:, r] for r in rows], axis=1)
+            ydata = transform(ydata, self.p.ctrl.logYCheck.isChecked())
+
+        return decimate(xdata, ydata, x_range, n_pixels)
+
+    def _full_x_range(self):
+        if self._is_large():
+            self._envelope()
+            ov = self._overview
+            return np.nanmin(ov["x_min"]), np.nanmax(ov["x_max"])
+        else:
+            return self._xdata.min(), self._xdata.max()
+
+    def _data_bounds(self, line, ax, frac=1.0, orthoRange=None):
+        """
+        Replaces :meth:`pg.PlotDataItem.dataBounds` of a curve and returns the range of
+        its full data. ``frac`` and ``orthoRange`` are ignored.
+        """
+        if line not in self.lines or len(self._xdata) == 0:
+            return [None, None]
+
+        key = (ax, self.p.ctrl.logYCheck.isChecked())
+
+        if key not in self._bounds:
+            if self._is_large():
+                x_first, lower, upper = self._envelope()
+                if ax == 0:
+                    lower, upper = self._overview["x_min"], self._overview["x_max"]
+                    lower, upper = lower[np.newaxis], upper[np.newaxis]
+            else:
+                data = self._xdata[np.newaxis] if ax == 0 else self._transformed_ydata()
+                lower = upper = data
+
+            # fmin and fmax only return NaN if all values are NaN
+            self._bounds[key] = (np.fmin.reduce(lower, 1), np.fmax.reduce(upper, 1))
+
+        i = 0 if ax == 0 else self.lines.index(line)
+        lower, upper = self._bounds[key][0][i], self._bounds[key][1][i]
+
+        if np.isfinite(lower) and np.isfinite(upper):
+            return [lower, upper]
+        else:
+            return [None, None]
+
+    def _on_log_mode_changed(self):
+        log_y = self.p.ctrl.logYCheck.isChecked()
+
+        # a single argument sets the log mode along the axis, also in pyqtgraph 0.11
+        for pos in ["left", "right"]:
+            self.p.getAxis(pos).setLogMode(log_y)
+
+        if len(self._xdata) > 0 and self.lines:
+            self._display_view = None
+            self._update_display_data(tuple(self.p.vb.viewRange()[0]))
+
+        self.p.enableAutoRange()
+
+    def _on_view_changed(self, *args):
+        if len(self._xdata) > 0 and self.lines:
+            x_range = tuple(self.p.vb.viewRange()[0])
+            self._update_display_data(x_range)
 
     def setTitle(self, text, fontScaling=None, color=None, font=None):
         # work around pyqtplot which forces the title to be HTML
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © keithleygui Project Contributors
+# Licensed under the terms of the MIT License
+# (see LICENSE.txt for details)
+
+"""
+Headless recipe runner.
+
+A recipe is a JSON file with a list of sweeps which are run back-to-back without the
+GUI. Each sweep is saved as soon as it has completed. For example::
+
+    {
+        "save_template": "{index:02d}_{sweep_type}_{time}.txt",
+        "smu_settings": {
+            "smua": {"sense": "SENSE_LOCAL", "limiti": 0.1, "limitv": 200},
+            "smub": {"sense": "SENSE_REMOTE", "limiti": 0.01, "highc": true}
+        },
+        "sweeps": [
+            {"sweep_type": "transfer", "VgStart": 10, "VgStop": -60, "VdList": [-5]},
+            {"sweep_type": "output", "VgList": [0, -20, -40, -60], "pulsed": true},
+            {"sweep_type": "iv", "VStart": -10, "VStop": 10, "smu_sweep": "smub"}
+        ]
+    }
+
+Sweep parameters and SMU settings which are not given in the recipe are taken from the
+defaults saved from the GUI. A sweep may override the recipe's SMU settings with its
+own "smu_settings" entry.
+"""
+
+# system imports
+import sys
+import json
+import os.path as osp
+import configparser as cp
+
+# local imports
+from keithleygui.measurement import (
+    SweepJob,
+    SMUSettingsCache,
+    run_job,
+    check_save_template,
+)
+from keithleygui.config.main import CONF
+
+SWEEP_PARAMS = {
+    "transfer": ["VgStart", "VgStop", "VgStep", "VdList"],
+    "output": ["VdStart", "VdStop", "VdStep", "VgList"],
+    "iv": ["VStart", "VStop", "VStep", "smu_sweep"],
+}
+
+GENERAL_PARAMS = ["tInt", "delay", "pulsed", "smu_gate", "smu_drain"]
+
+# config options which are named differently from the sweep parameters
+CONF_OPTIONS = {"smu_gate": "gate", "smu_drain": "drain"}
+
+SMU_OPTIONS = ["sense", "limiti", "limitv", "highc"]
+
+
+class RecipeError(Exception):
+    """Raised for invalid recipes."""
+
+
+def load_recipe(path, output_dir="."):
+    """
+    Loads a recipe file and creates a sweep job for every sweep.
+
+    :param path: Path to a JSON recipe file.
+    :param output_dir: Directory to save sweep data in. The file names are given by
+        the recipe's "save_template" or the sequencer template from the config.
+    :returns: List of :class:`keithleygui.measurement.SweepJob` instances.
+    :raises: :class:`RecipeError` if the recipe is invalid.
+    """
+
+    with open(path) as f:
+        try:
+            recipe = json.load(f)
+        except ValueError as exc:
+            raise RecipeError(f"Recipe is not valid JSON: {exc}")
+
+    if isinstance(recipe, list):
+        recipe = {"sweeps": recipe}
+
+    template = recipe.get("save_template", CONF.get("Sequencer", "template"))
+    template = osp.join(osp.expanduser(output_dir), template)
+
+    jobs = []
+
+    for index, sweep in enumerate(recipe.get("sweeps", []), start=1):
+        params = _sweep_params(sweep, index)
+
+        try:
+            check_save_template(template, [params])
+        except ValueError as exc:
+            raise RecipeError(f"Sweep {index}: {exc}")
+
+        smu_names = {params["smu_gate"], params["smu_drain"]}
+        if params["sweep_type"] == "iv":
+            smu_names.add(params["smu_sweep"])
+
+        smu_settings = _default_smu_settings(smu_names)
+
+        overrides = [recipe.get("smu_settings", {}), sweep.get("smu_settings", {})]
+
+        for override in overrides:
+            for name, settings in override.items():
+                smu_settings.setdefault(name, {}).update(settings)
+
+        for name, settings in smu_settings.items():
+            missing = [opt for opt in SMU_OPTIONS if opt not in settings]
+            if missing:
+                raise RecipeError(
+                    f"Sweep {index}: settings of SMU '{name}' are missing {missing}."
+                )
+
+        jobs.append(SweepJob(params, smu_settings, template, index))
+
+    if len(jobs) == 0:
+        raise RecipeError("Recipe does not contain any sweeps.")
+
+    return jobs
+
+
+def run_recipe(keithley, jobs, stream=sys.stdout):
+    """
+    Runs sweep jobs one after another and saves their data as soon as they complete.
+
+    :param keithley: Keithley2600 instance.
+    :param jobs: List of :class:`keithleygui.measurement.SweepJob` instances.
+    :param stream: Stream for progress messages.
+    :returns: Number of sweeps which failed, were aborted or could not be saved.
+    """
+
+    n_failed = 0
+    smu_cache = SMUSettingsCache()
+
+    for job in jobs:
+        prefix = f"[{job.index}/{len(jobs)}] {job.params['sweep_type']}"
+        print(f"{prefix}: running", file=stream, flush=True)
+
+        def callback(sweep_data):
+            print(f"{prefix}: {sweep_data.column_names[-1]}", file=stream, flush=True)
+
+        try:
+            run_job(keithley, job, callback, smu_cache)
+        except KeyboardInterrupt:
+            keithley.abort_event.set()
+            keithley.reset()
+            raise
+
+        if job.state == SweepJob.DONE and osp.isfile(job.save_path or ""):
+            msg = f"{prefix}: finished in {job.timer.total:.1f} s"
+            msg += f", saved to {job.save_path}"
+            print(f"{msg} ({job.timer})", file=stream, flush=True)
+            continue
+
+        n_failed += 1
+
+        if job.state == SweepJob.FAILED:
+            exc = job.error
+            msg = f"{prefix}: {exc.__class__.__name__}: {exc}"
+        else:
+            msg = f"{prefix}: {job.state}, not saved"
+
+        if job.journal_path is not None:
+            msg += f", data kept in {job.journal_path}"
+
+        print(msg, file=stream, flush=True)
+
+    return n_failed
+
+
+def _sweep_params(sweep, index):
+    """Completes the parameters of a single sweep with the config defaults."""
+
+    sweep_type = sweep.get("sweep_type")
+
+    if sweep_type not in SWEEP_PARAMS:
+        raise RecipeError(
+            f"Sweep {index}: 'sweep_type' must be one of {list(SWEEP_PARAMS)}."
+        )
+
+    params = {"sweep_type": sweep_type}
+
+    for name in SWEEP_PARAMS[sweep_type] + GENERAL_PARAMS:
+        if name in sweep:
+            params[name] = sweep[name]
+        else:
+            params[name] = CONF.get("Sweep", CONF_OPTIONS.get(name, name))
+
+    unknown = set(sweep) - set(params) - {"smu_settings"}
+
+    if unknown:
+        raise RecipeError(f"Sweep {index}: unknown parameters {sorted(unknown)}.")
+
+    return params
+
+
+def _default_smu_settings(smu_names):
+    """Returns the saved SMU settings for the given SMUs, if any."""
+
+    smu_settings = dict()
+
+    for name in smu_names:
+        try:
+            section = CONF.get_section(name)
+            smu_settings[name] = {opt: section[opt] for opt in SMU_OPTIONS}
+        except (cp.NoSectionError, KeyError):
+            pass
+
+    return smu_settings
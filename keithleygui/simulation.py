@@ -0,0 +1,386 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © keithleygui Project Contributors
+# Licensed under the terms of the MIT License
+# (see LICENSE.txt for details)
+
+"""
+Simulated Keithley 2600 for development and benchmarking without hardware.
+
+:class:`SimulatedKeithley2600` implements the part of the
+:class:`keithley2600.Keithley2600` interface which is used by keithleygui. It models
+VISA round-trip latency, the power line frequency, integration and settling times and
+the read-back of SMU buffers. Measured currents are those of a p-type field-effect
+transistor with the gate connected to smua and the drain connected to smub.
+
+A simulated instrument is used when the VISA library is set to "@sim", either in the
+connection settings or on the command line.
+"""
+
+# system imports
+import math
+import threading
+
+# external imports
+import numpy as np
+from keithley2600.keithley_driver import KeithleyIOError
+
+SIMULATION_LIBRARY = "@sim"
+
+
+def is_simulated(visa_library):
+    """Returns ``True`` if the VISA library selects a simulated instrument."""
+    return visa_library == SIMULATION_LIBRARY
+
+
+def create_keithley(visa_address, visa_library):
+    """
+    Creates a Keithley instance for the given VISA address and library.
+
+    :param visa_address: VISA address of the instrument.
+    :param visa_library: VISA library. If this is "@sim", a
+        :class:`SimulatedKeithley2600` is returned.
+    :returns: A :class:`keithley2600.Keithley2600` or :class:`SimulatedKeithley2600`.
+    """
+    if is_simulated(visa_library):
+        return SimulatedKeithley2600(visa_address)
+
+    from keithley2600 import Keithley2600
+
+    return Keithley2600(visa_address, visa_library)
+
+
+class FETModel:
+    """
+    Smooth square-law model of a p-type field-effect transistor with grounded source.
+    The model is continuous from sub-threshold to saturation and symmetric in source
+    and drain.
+
+    :param k: Transconductance parameter W/L * mu * Ci in A/V^2.
+    :param v_th: Threshold voltage in V.
+    :param swing: Sub-threshold smoothing voltage in V.
+    :param i_off: Off-current per volt drain voltage in A/V.
+    :param g_leak: Gate leakage conductance in S.
+    """
+
+    def __init__(self, k=1e-7, v_th=-5.0, swing=1.0, i_off=1e-12, g_leak=1e-12):
+        self.k = k
+        self.v_th = v_th
+        self.swing = swing
+        self.i_off = i_off
+        self.g_leak = g_leak
+
+    def _f(self, x):
+        # softplus squared: x**2 above threshold, exponential tail below
+        return (self.swing * np.logaddexp(0, x / self.swing)) ** 2
+
+    def currents(self, v_g, v_d):
+        """
+        Returns gate and drain currents for the given gate and drain voltages.
+        Currents are positive when flowing from the SMU into the device.
+        """
+        v_g = np.asarray(v_g, dtype=float)
+        v_d = np.asarray(v_d, dtype=float)
+
+        # evaluate as n-type with mirrored voltages and mirror the current back
+        vov = -(v_g - self.v_th)
+        i_d = -self.k / 2 * (self._f(vov) - self._f(vov + v_d))
+        i_d = i_d + self.i_off * v_d
+
+        i_g = self.g_leak * (2 * v_g - v_d)
+
+        return i_g, i_d
+
+
+class _SimulatedNode:
+    """
+    Node in the simulated TSP namespace. Every attribute read or write costs one
+    VISA round-trip, like for the real instrument.
+    """
+
+    def __init__(self, instrument, **values):
+        object.__setattr__(self, "_instrument", instrument)
+        object.__setattr__(self, "_values", dict(values))
+        object.__setattr__(self, "_defaults", dict(values))
+
+    def __getattr__(self, name):
+        values = object.__getattribute__(self, "_values")
+
+        if name not in values:
+            raise AttributeError(name)
+
+        self._instrument._io()
+        return values[name]
+
+    def __setattr__(self, name, value):
+        if name not in self._values:
+            raise AttributeError(name)
+
+        self._instrument._io()
+        self._values[name] = value
+
+    def _add_node(self, name, node):
+        object.__setattr__(self, name, node)
+
+    def _reset(self):
+        self._values.update(self._defaults)
+
+
+class SimulatedSMU(_SimulatedNode):
+    """Simulated SMU channel."""
+
+    SENSE_LOCAL = 0
+    SENSE_REMOTE = 1
+    DISABLE = 0
+    ENABLE = 1
+    OUTPUT_OFF = 0
+    OUTPUT_ON = 1
+
+    def __init__(self, instrument, name):
+        super().__init__(instrument, sense=self.SENSE_LOCAL)
+
+        self._add_node("name", name)
+        self._add_node(
+            "source",
+            _SimulatedNode(
+                instrument, limiti=0.1, limitv=20.0, highc=0, levelv=0.0, output=0
+            ),
+        )
+        self._add_node("measure", _SimulatedNode(instrument, nplc=1.0, delay=-1.0))
+        self._add_node("trigger", _SimulatedNode(instrument))
+        self.trigger._add_node(
+            "source", _SimulatedNode(instrument, limiti=0.1, limitv=20.0)
+        )
+
+    def abort(self):
+        self._instrument._io()
+
+    def _reset(self):
+        super()._reset()
+        for node in (self.source, self.measure, self.trigger.source):
+            node._reset()
+
+
+class SimulatedKeithley2600:
+    """
+    In-process stand-in for :class:`keithley2600.Keithley2600`.
+
+    :param visa_address: Nominal VISA address, only used for display.
+    :param model: Instrument model returned by ``localnode.model``.
+    :param line_frequency: Power line frequency in Hz.
+    :param visa_latency: Duration of one VISA round-trip in sec.
+    :param auto_delay: Settling time per point in sec if the delay is set to auto.
+    :param time_scale: Factor applied to all simulated waiting times. Use 0 to run as
+        fast as possible while still accounting for the simulated time.
+    :param seed: Seed for the measurement noise.
+
+    :cvar simulated_time: Total instrument time in sec which has been simulated since
+        creation. This is independent of ``time_scale``.
+    """
+
+    # approximate number of commands sent by the driver to set up one SMU for a sweep
+    SWEEP_SETUP_COMMANDS = 40
+
+    # the driver polls the sweep status in 0.1 sec intervals
+    STATUS_POLL_INTERVAL = 0.1
+
+    def __init__(
+        self,
+        visa_address="SIM::KEITHLEY2600::INSTR",
+        model="2612B",
+        line_frequency=50,
+        visa_latency=0.002,
+        auto_delay=0.003,
+        time_scale=1.0,
+        seed=None,
+    ):
+        self.visa_address = visa_address
+        self.visa_library = SIMULATION_LIBRARY
+        self.visa_latency = visa_latency
+        self.auto_delay = auto_delay
+        self.time_scale = time_scale
+
+        self.abort_event = threading.Event()
+        self.connected = False
+        self.connection = None
+        self.simulated_time = 0.0
+
+        self.device = FETModel()
+        self._rng = np.random.default_rng(seed)
+        self._measurement_lock = threading.RLock()
+
+        self.localnode = _SimulatedNode(
+            self, model=model, serialno="4242424", linefreq=float(line_frequency)
+        )
+        self.beeper = _SimulatedBeeper(self)
+        self.smua = SimulatedSMU(self, "smua")
+        self.smub = SimulatedSMU(self, "smub")
+
+        self.connect()
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}({self.visa_address})>"
+
+    @property
+    def busy(self):
+        """True if a measurement is running, False otherwise."""
+
+        gotten = self._measurement_lock.acquire(blocking=False)
+
+        if gotten:
+            self._measurement_lock.release()
+
+        return not gotten
+
+    # =============================================================================
+    # Connection
+    # =============================================================================
+
+    def connect(self, **kwargs):
+        self._wait(5 * self.visa_latency)
+        # stands in for the pyvisa resource, a new one is opened on every connect
+        self.connection = object()
+        self.connected = True
+        return self.connected
+
+    def disconnect(self):
+        self.connection = None
+        self.connected = False
+
+    # =============================================================================
+    # Simulated timing
+    # =============================================================================
+
+    def _io(self):
+        """Simulates one VISA round-trip."""
+        if not self.connected:
+            raise KeithleyIOError("No connection to keithley present.")
+        self._wait(self.visa_latency)
+
+    def _wait(self, duration):
+        """
+        Accounts for ``duration`` sec of instrument time and sleeps accordingly.
+
+        :returns: ``True`` if the abort event was set while waiting.
+        """
+        self.simulated_time += duration
+        delay = duration * self.time_scale
+
+        if delay > 0:
+            return self.abort_event.wait(delay)
+        else:
+            return self.abort_event.is_set()
+
+    def _point_duration(self, t_int, delay, pulsed):
+        """Instrument time for a single source-measure cycle."""
+        freq = self.localnode.linefreq
+        nplc = t_int * freq
+
+        if nplc < 0.001 or nplc > 25:
+            raise ValueError(
+                "Integration time must be between 0.001 and 25 "
+                f"power line cycles of 1/({freq} Hz)."
+            )
+
+        settling = self.auto_delay if delay == -1 else delay
+
+        if pulsed:
+            # the source returns to idle between points and needs to settle again
+            settling *= 2
+
+        return settling + t_int
+
+    # =============================================================================
+    # High level functions
+    # =============================================================================
+
+    def reset(self):
+        self._io()
+        for smu in (self.smua, self.smub):
+            smu._reset()
+
+    def voltage_sweep_single_smu(self, smu, smu_sweeplist, t_int, delay, pulsed):
+        """
+        Simulates :meth:`keithley2600.Keithley2600.voltage_sweep_single_smu`. The other
+        SMU is assumed to be at 0 V.
+        """
+        v_other = np.zeros(len(smu_sweeplist))
+        v_smu, i_smu, _, _ = self._sweep(
+            smu, smu_sweeplist, v_other, t_int, delay, pulsed, n_smus=1
+        )
+        return v_smu, i_smu
+
+    def voltage_sweep_dual_smu(
+        self, smu1, smu2, smu1_sweeplist, smu2_sweeplist, t_int, delay, pulsed
+    ):
+        """Simulates :meth:`keithley2600.Keithley2600.voltage_sweep_dual_smu`."""
+        if len(smu1_sweeplist) != len(smu2_sweeplist):
+            raise ValueError("Sweep lists must have equal lengths.")
+
+        return self._sweep(
+            smu1, smu1_sweeplist, smu2_sweeplist, t_int, delay, pulsed, n_smus=2
+        )
+
+    def _sweep(self, smu, sweeplist, other_sweeplist, t_int, delay, pulsed, n_smus):
+
+        with self._measurement_lock:
+
+            v_smu, i_smu, v_other, i_other = [], [], [], []
+
+            if self.abort_event.is_set():
+                return v_smu, i_smu, v_other, i_other
+
+            # configure SMUs and trigger model
+            for _ in range(n_smus * self.SWEEP_SETUP_COMMANDS):
+                self._io()
+
+            t_point = self._point_duration(t_int, delay, pulsed)
+            sweep_time = 0.0
+
+            for v1, v2 in zip(sweeplist, other_sweeplist):
+                sweep_time += t_point
+                if self._wait(t_point):
+                    break
+                v_smu.append(float(v1))
+                v_other.append(float(v2))
+
+            # the driver notices the end of the sweep on its next status poll
+            n_polls = math.ceil(sweep_time / self.STATUS_POLL_INTERVAL)
+            self._wait(n_polls * self.STATUS_POLL_INTERVAL - sweep_time)
+
+            # currents of the gate (smua) and drain (smub) terminals
+            if smu.name == "smua":
+                v_g, v_d = np.array(v_smu), np.array(v_other)
+            else:
+                v_g, v_d = np.array(v_other), np.array(v_smu)
+
+            i_g, i_d = self.device.currents(v_g, v_d)
+            i_g, i_d = self._noisy(i_g, t_int), self._noisy(i_d, t_int)
+
+            if smu.name == "smua":
+                i_smu, i_other = list(i_g), list(i_d)
+            else:
+                i_smu, i_other = list(i_d), list(i_g)
+
+            # read back current and voltage buffers point by point
+            for _ in range(2 * n_smus * len(v_smu)):
+                self._io()
+
+            return v_smu, i_smu, v_other, i_other
+
+    def _noisy(self, current, t_int):
+        """Adds measurement noise which decreases with the integration time."""
+        nplc = t_int * self.localnode.linefreq
+        sigma = 1e-3 * np.abs(current) + 1e-13 / math.sqrt(nplc)
+        return current + self._rng.normal(0, 1, np.shape(current)) * sigma
+
+
+class _SimulatedBeeper:
+    """Simulated beeper. A beep blocks further commands for its duration."""
+
+    def __init__(self, instrument):
+        self._instrument = instrument
+
+    def beep(self, duration, frequency):
+        self._instrument._io()
+        self._instrument._wait(duration)
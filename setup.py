@@ -15,9 +15,9 @@ setup(
         "keithleygui": ["*.ui", "*/*.ui"],
     },
     entry_points={
-        "console_scripts": ["keithleygui=keithleygui.main:run"],
+        "console_scripts": ["keithleygui=keithleygui.cli:run"],
     },
-    python_requires=">=3.6",
+    python_requires=">=3.7",
     install_requires=[
         "keithley2600>=2.0.0",
         "numpy",
@@ -33,7 +33,6 @@ setup(
         "License :: OSI Approved :: MIT License",
         "Operating System :: Unix",
         "Programming Language :: Python",
-        "Programming Language :: Python :: 3.6",
         "Programming Language :: Python :: 3.7",
         "Programming Language :: Python :: 3.8",
     ],